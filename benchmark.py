@@ -5,8 +5,15 @@ performance metrics like runtime, congestion, and energy usage.
 """
 
 import matplotlib.pyplot as plt
+import numpy as np
 from main import create_random_warehouse
-from optimization import simulated_annealing_optimizer, mosa_optimizer, evaluate_layout
+
+try:
+    import plotly.graph_objects as go
+except ImportError:  # Plotly is optional; fall back to matplotlib
+    go = None
+from optimization import (run_parallel_sa_chains, run_parallel_mosa_chains,
+                          evaluate_layout)
 
 def run_single_objective_optimization():
     """
@@ -22,7 +29,7 @@ def run_single_objective_optimization():
     print(f"\n--- Running Optimizer with Weights: {weights} ---")
     initial_warehouse, _, _ = create_random_warehouse(20, 20, num_robots)
     
-    best_layout, best_metrics, history = simulated_annealing_optimizer(
+    best_layout, best_metrics, chain_histories = run_parallel_sa_chains(
         initial_warehouse=initial_warehouse,
         num_robots=num_robots,
         weights=weights,
@@ -30,20 +37,22 @@ def run_single_objective_optimization():
         cool_rate=0.95,
         iters=100
     )
-    
+
     print(f"--- Single-Objective Optimization Complete. Best Metrics: {best_metrics} ---")
 
     # Visualize the final optimized layout and its performance
     best_layout.visualize_congestion_map(
         title=f"Single-Objective Optimized Layout"
     )
-    
-    # Plot convergence
+
+    # Plot convergence of every chain
     plt.figure(figsize=(10, 6))
-    plt.plot(history['cost'])
+    for i, history in enumerate(chain_histories):
+        plt.plot(history['cost'], label=f"Chain {i}")
     plt.xlabel("Iteration")
     plt.ylabel("Cost")
     plt.title("Convergence of Single-Objective Simulated Annealing")
+    plt.legend()
     plt.grid(True)
     plt.show()
 
@@ -58,7 +67,7 @@ def run_multi_objective_optimization():
     num_robots = 5
     initial_warehouse, _, _ = create_random_warehouse(20, 20, num_robots)
     
-    pareto_archive, history = mosa_optimizer(
+    pareto_archive, chain_histories = run_parallel_mosa_chains(
         initial_warehouse=initial_warehouse,
         num_robots=num_robots,
         temp=1000,
@@ -77,14 +86,28 @@ def plot_pareto_front(pareto_front):
         print("Cannot plot Pareto front: No data.")
         return
 
+    # Convert once up front; both backends take the arrays as-is
+    distances = np.fromiter((p['total_distance'] for p in pareto_front), dtype=np.float32)
+    congestions = np.fromiter((p['max_congestion'] for p in pareto_front), dtype=np.float32)
+    energies = np.fromiter((p['total_energy'] for p in pareto_front), dtype=np.float32)
+
+    if go is not None:
+        # Plotly renders through WebGL, so large archives stay interactive
+        fig = go.Figure(data=[go.Scatter3d(
+            x=distances, y=congestions, z=energies, mode='markers',
+            marker=dict(size=4, color='blue'))])
+        fig.update_layout(
+            title='Pareto Front: Distance vs. Congestion vs. Energy',
+            scene=dict(
+                xaxis=dict(title='Total Distance (Lower is Better)', autorange='reversed'),
+                yaxis=dict(title='Max Congestion (Lower is Better)', autorange='reversed'),
+                zaxis=dict(title='Total Energy (Lower is Better)', autorange='reversed')))
+        fig.show()
+        return
+
     fig = plt.figure(figsize=(12, 9))
     ax = fig.add_subplot(111, projection='3d')
 
-    # Extract data for plotting
-    distances = [p['total_distance'] for p in pareto_front]
-    congestions = [p['max_congestion'] for p in pareto_front]
-    energies = [p['total_energy'] for p in pareto_front]
-
     ax.scatter(distances, congestions, energies, c='blue', s=60, marker='o')
 
     ax.set_xlabel('Total Distance (Lower is Better)')
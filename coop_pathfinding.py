@@ -0,0 +1,151 @@
+"""
+Cooperative multi-robot planning over a time-expanded grid.
+
+The regular controller plans each robot independently against a snapshot of
+the other robots and repairs conflicts by replanning when a move is blocked.
+This module offers the alternative batch approach (Silver-style cooperative
+A*): robots are planned one after another through (x, y, t) space against a
+shared reservation table, so the returned paths are conflict-free by
+construction and no replanning is needed while they are followed.
+
+Paths are time-indexed: entry t of a path is where the robot stands after t
+steps, and consecutive equal entries mean the robot waits a tick to let a
+higher-priority robot pass.
+"""
+
+import heapq
+from collections import deque
+
+import fast_sim
+from pathfinding import compute_distance_field
+
+
+def plan_all_robots(warehouse, starts, goals, horizon=None):
+    """
+    Plan conflict-free time-indexed paths for a fleet of robots.
+
+    Robots are planned in dict order, which doubles as their priority:
+    earlier robots reserve their cells first and later robots route (or
+    wait) around them. Both vertex conflicts (two robots on one cell at the
+    same tick) and edge conflicts (two robots swapping cells between ticks)
+    are excluded by the reservation table.
+
+    Args:
+        warehouse (Warehouse): The warehouse instance.
+        starts (dict): Mapping of robot_id to starting position (x, y).
+        goals (dict): Mapping of robot_id to goal position (x, y).
+        horizon (int, optional): Maximum number of ticks to plan for.
+            Defaults to twice the grid perimeter, which comfortably covers
+            detours on warehouse layouts.
+
+    Returns:
+        dict: Mapping of robot_id to a list of (x, y) positions, one per
+            tick starting at the start position, or None for robots for
+            which no conflict-free path exists within the horizon. A robot
+            that reaches its goal keeps its goal cell reserved afterwards.
+    """
+    width, height = warehouse.width, warehouse.height
+    if horizon is None:
+        horizon = 4 * (width + height)
+
+    passable = warehouse.get_passability_mask().astype(bool)
+
+    # reserved_vertex[t] holds the cells occupied at tick t; an edge is
+    # reserved as ((from), (to)) for the move taken between t-1 and t, and
+    # the reverse move is what a later robot must not take.
+    reserved_vertex = {}
+    reserved_edge = {}
+
+    paths = {}
+    for robot_id, start in starts.items():
+        goal = goals[robot_id]
+        path = _space_time_astar(warehouse, passable, start, goal, horizon,
+                                 reserved_vertex, reserved_edge)
+        paths[robot_id] = path
+        if path is None:
+            # The robot cannot move this round; it still occupies its start
+            # cell, so later robots must plan around it.
+            for t in range(horizon + 1):
+                reserved_vertex.setdefault(t, set()).add(start)
+            continue
+        for t, pos in enumerate(path):
+            reserved_vertex.setdefault(t, set()).add(pos)
+            if t > 0:
+                reserved_edge.setdefault(t, set()).add((path[t - 1], pos))
+        # Park on the goal for the rest of the horizon
+        for t in range(len(path), horizon + 1):
+            reserved_vertex.setdefault(t, set()).add(path[-1])
+    return paths
+
+
+def _space_time_astar(warehouse, passable, start, goal, horizon,
+                      reserved_vertex, reserved_edge):
+    """
+    A* through (x, y, t) states with waiting allowed, honoring the shared
+    reservation table. Returns the time-indexed path or None.
+    """
+    height = warehouse.height
+    goal_x, goal_y = goal
+
+    # The BFS field is an exact lower bound and prunes dead ends outright;
+    # fall back to Manhattan distance without the compiled kernels.
+    h_field = compute_distance_field(warehouse, goal)
+
+    def h(pos):
+        if h_field is not None:
+            d = h_field[pos[0], pos[1]]
+            if d >= 0:
+                return float(d)
+            if pos != goal:
+                return float('inf')  # Disconnected from the goal
+            return 0.0
+        return abs(pos[0] - goal_x) + abs(pos[1] - goal_y)
+
+    start_state = (start, 0)
+    open_set = [(h(start), start_state)]
+    came_from = {start_state: None}
+    closed = set()
+
+    while open_set:
+        _, state = heapq.heappop(open_set)
+        if state in closed:
+            continue
+        closed.add(state)
+        pos, t = state
+
+        if pos == goal:
+            # The goal must stay conflict-free while the robot parks on it
+            if all(goal not in reserved_vertex.get(t2, ())
+                   for t2 in range(t + 1, horizon + 1)):
+                path = deque()
+                while state is not None:
+                    path.appendleft(state[0])
+                    state = came_from[state]
+                return list(path)
+
+        if t >= horizon:
+            continue
+
+        x, y = pos
+        for dx, dy in ((0, 0), (0, 1), (0, -1), (1, 0), (-1, 0)):
+            nx, ny = x + dx, y + dy
+            npos = (nx, ny)
+            if npos != pos:
+                if not (0 <= nx < warehouse.width and 0 <= ny < height):
+                    continue
+                if not passable[nx, ny] and npos != goal:
+                    continue
+            nstate = (npos, t + 1)
+            if nstate in closed or nstate in came_from:
+                continue
+            if npos in reserved_vertex.get(t + 1, ()):
+                continue
+            if (npos, pos) in reserved_edge.get(t + 1, ()):
+                continue  # Head-on swap with a higher-priority robot
+            hn = h(npos)
+            if hn == float('inf'):
+                continue
+            came_from[nstate] = state
+            heapq.heappush(open_set, (t + 1 + hn, nstate))
+
+    return None
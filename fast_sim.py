@@ -0,0 +1,284 @@
+"""
+Numba-accelerated kernels for the hot simulation loops.
+
+The simulation spends most of its time stepping robots and searching paths
+inside the SA/MOSA optimizers, so the tight per-robot work is implemented
+here as compiled kernels operating on plain NumPy arrays. numba is treated
+as an optional accelerator: when it is not installed, callers fall back to
+their pure-Python implementations.
+
+The kernels carry explicit type signatures, so they are compiled eagerly
+when this module is first imported rather than lazily inside the optimizer
+loop, and cache=True persists the machine code under __pycache__ so later
+processes (including pool workers) just load it from disk.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
+# Integer direction codes shared with the controller.
+DIRECTION_CODES = {"up": 0, "down": 1, "left": 2, "right": 3}
+
+# Reverse lookup for log output.
+DIRECTION_NAMES = ("up", "down", "left", "right")
+
+# Coordinate deltas indexed by direction code (up, down, left, right).
+# "up" decreases y to match the grid orientation used by the visualizer.
+DX = np.array([0, 0, -1, 1], dtype=np.int32)
+DY = np.array([-1, 1, 0, 0], dtype=np.int32)
+
+
+if NUMBA_AVAILABLE:
+
+    @njit('uint8[::1](int32[:, ::1], int8[::1], uint8[:, ::1])',
+          cache=True, fastmath=True)
+    def step_all(pos, codes, passable):
+        """
+        Advance every robot by one queued command.
+
+        Robots are processed in order, each seeing the partially updated
+        positions of the others, which mirrors the sequential semantics of
+        the Python stepping loop.
+
+        Args:
+            pos (int32[N, 2]): Current robot positions, updated in place.
+            codes (int8[N]): Direction code per robot, -1 for "no command".
+            passable (uint8[W, H]): 1 where a robot may stand (aisle, dock or
+                station cell that is not blocked by storage).
+
+        Returns:
+            uint8[N]: 1 for each robot whose move succeeded, else 0.
+        """
+        n = pos.shape[0]
+        width, height = passable.shape
+        success = np.zeros(n, dtype=np.uint8)
+
+        for i in range(n):
+            code = codes[i]
+            if code < 0:
+                continue
+
+            new_x = pos[i, 0] + DX[code]
+            new_y = pos[i, 1] + DY[code]
+
+            if new_x < 0 or new_x >= width or new_y < 0 or new_y >= height:
+                continue
+            if passable[new_x, new_y] == 0:
+                continue
+
+            occupied = False
+            for j in range(n):
+                if j != i and pos[j, 0] == new_x and pos[j, 1] == new_y:
+                    occupied = True
+                    break
+            if occupied:
+                continue
+
+            pos[i, 0] = new_x
+            pos[i, 1] = new_y
+            success[i] = 1
+
+        return success
+
+    @njit('float32[::1](float32[:, ::1], int32[:, ::1], uint8[::1])',
+          cache=True, fastmath=True)
+    def bump_congestion(grid, pos, moved):
+        """
+        Record one congestion visit for every robot that moved this tick.
+
+        Fuses the per-robot record-and-read round trips of a whole tick
+        into one native loop over the SoA position array.
+
+        Args:
+            grid (float32[W, H]): Dense congestion grid, updated in place.
+            pos (int32[N, 2]): Robot positions after the step.
+            moved (uint8[N]): 1 for robots whose move succeeded.
+
+        Returns:
+            float32[N]: Updated visit count per moved robot, 0 for the rest.
+        """
+        n = pos.shape[0]
+        width, height = grid.shape
+        counts = np.zeros(n, dtype=np.float32)
+        for i in range(n):
+            if moved[i] == 0:
+                continue
+            x = pos[i, 0]
+            y = pos[i, 1]
+            if x < 0 or x >= width or y < 0 or y >= height:
+                continue
+            grid[x, y] += 1.0
+            counts[i] = grid[x, y]
+        return counts
+
+    @njit('int32[:, ::1](uint8[:, ::1], int64, int64)', cache=True,
+          fastmath=True)
+    def bfs_field(passable, goal_x, goal_y):
+        """
+        Distance-to-goal field via breadth-first search over passable cells.
+
+        One field per goal can serve every robot heading there and stays
+        valid until the layout changes, so callers memoize the result.
+        The goal cell itself is the source even when it is not passable
+        (docks are blocked cells that paths may still end on).
+
+        Returns:
+            int32[W, H]: Steps to the goal per cell, -1 where unreachable.
+        """
+        width, height = passable.shape
+        dist = np.full((width, height), -1, dtype=np.int32)
+        queue = np.empty(width * height, dtype=np.int32)
+
+        dist[goal_x, goal_y] = 0
+        queue[0] = goal_x * height + goal_y
+        head = 0
+        tail = 1
+        while head < tail:
+            node = queue[head]
+            head += 1
+            x = node // height
+            y = node % height
+            d = dist[x, y] + 1
+            for k in range(4):
+                nx = x + DX[k]
+                ny = y + DY[k]
+                if nx < 0 or nx >= width or ny < 0 or ny >= height:
+                    continue
+                if passable[nx, ny] == 0 or dist[nx, ny] >= 0:
+                    continue
+                dist[nx, ny] = d
+                queue[tail] = nx * height + ny
+                tail += 1
+        return dist
+
+    @njit('int32[::1](uint8[:, ::1], float32[:, ::1], uint8[:, ::1], '
+          'float32[:, ::1], int64, int64, int64, int64, float64)',
+          cache=True, fastmath=True)
+    def astar(passable, congestion, occupied, h_field, start_x, start_y,
+              goal_x, goal_y, congestion_penalty):
+        """
+        A* over the warehouse grid with nodes encoded as x * height + y.
+
+        Uses a dense float32 g_score, a dense parent array and a manually
+        managed binary heap, so no Python objects are allocated per expanded
+        node. Stale heap entries are skipped on pop (lazy deletion). Cells
+        that are not passable are skipped unless they are the goal, matching
+        the goal exemption of the Python implementation; cells occupied by
+        other robots are never entered.
+
+        h_field is the admissible heuristic per cell (Manhattan distance, or
+        an exact BFS distance-to-goal field); cells marked -1 are known to be
+        unreachable from the goal and are pruned outright.
+
+        Returns:
+            int32[:]: Flat node indices from start to goal, empty if no path.
+        """
+        width, height = passable.shape
+        n = width * height
+        start = start_x * height + start_y
+        goal = goal_x * height + goal_y
+
+        g_score = np.full(n, np.inf, dtype=np.float32)
+        came_from = np.full(n, -1, dtype=np.int32)
+        closed = np.zeros(n, dtype=np.uint8)
+
+        heap_f = np.empty(1024, dtype=np.float32)
+        heap_node = np.empty(1024, dtype=np.int32)
+        g_score[start] = 0.0
+        # The start cell (e.g. a dock the robot stands on) may sit outside
+        # the heuristic field; its f value is irrelevant as it pops first.
+        heap_f[0] = max(h_field[start_x, start_y], 0.0)
+        heap_node[0] = start
+        size = 1
+
+        while size > 0:
+            # Pop the node with the lowest f score
+            current = heap_node[0]
+            size -= 1
+            heap_f[0] = heap_f[size]
+            heap_node[0] = heap_node[size]
+            i = 0
+            while True:
+                left = 2 * i + 1
+                right = left + 1
+                smallest = i
+                if left < size and heap_f[left] < heap_f[smallest]:
+                    smallest = left
+                if right < size and heap_f[right] < heap_f[smallest]:
+                    smallest = right
+                if smallest == i:
+                    break
+                heap_f[i], heap_f[smallest] = heap_f[smallest], heap_f[i]
+                heap_node[i], heap_node[smallest] = heap_node[smallest], heap_node[i]
+                i = smallest
+
+            if closed[current]:
+                continue  # Stale duplicate entry
+
+            if current == goal:
+                # Reconstruct the path by walking the parent array backwards
+                length = 1
+                node = goal
+                while came_from[node] >= 0:
+                    node = came_from[node]
+                    length += 1
+                path = np.empty(length, dtype=np.int32)
+                node = goal
+                for k in range(length - 1, -1, -1):
+                    path[k] = node
+                    node = came_from[node]
+                return path
+
+            closed[current] = 1
+            current_x = current // height
+            current_y = current % height
+            base_g = g_score[current]
+
+            for d in range(4):
+                nx = current_x + DX[d]
+                ny = current_y + DY[d]
+                if nx < 0 or nx >= width or ny < 0 or ny >= height:
+                    continue
+                neighbor = nx * height + ny
+                if closed[neighbor]:
+                    continue
+                if occupied[nx, ny] != 0:
+                    continue
+                if neighbor != goal:
+                    if passable[nx, ny] == 0:
+                        continue
+                    if h_field[nx, ny] < 0:
+                        continue  # Provably disconnected from the goal
+
+                tentative = base_g + 1.0 + congestion[nx, ny] * congestion_penalty
+                if tentative < g_score[neighbor]:
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = current
+
+                    if size == heap_f.shape[0]:
+                        grown_f = np.empty(size * 2, dtype=np.float32)
+                        grown_node = np.empty(size * 2, dtype=np.int32)
+                        grown_f[:size] = heap_f
+                        grown_node[:size] = heap_node
+                        heap_f = grown_f
+                        heap_node = grown_node
+
+                    heap_f[size] = tentative + max(h_field[nx, ny], 0.0)
+                    heap_node[size] = neighbor
+                    i = size
+                    size += 1
+                    while i > 0:
+                        parent = (i - 1) // 2
+                        if heap_f[parent] <= heap_f[i]:
+                            break
+                        heap_f[i], heap_f[parent] = heap_f[parent], heap_f[i]
+                        heap_node[i], heap_node[parent] = heap_node[parent], heap_node[i]
+                        i = parent
+
+        return np.empty(0, dtype=np.int32)
@@ -5,91 +5,139 @@ Creates an initial warehouse layout with infrastructure and robots, then display
 
 from warehouse import Warehouse
 from robot import Robot
-from pathfinding import a_star_search
+from pathfinding import a_star_search, compute_distance_field
+from collections import defaultdict, deque
+from itertools import product
 import random
+import numpy as np
+import fast_sim
+
+
+# Direction code for a unit step (dx, dy), indexed as [dx + 1][dy + 1].
+_DIR_FROM_DELTA = ((None, 2, None),
+                   (0, None, 1),
+                   (None, 3, None))
 
 
 class RobotController:
-    def __init__(self, warehouse):
+    def __init__(self, warehouse, verbose=True):
         self.warehouse = warehouse
-        self.robot_commands = {}  # Store command queues for each robot
+        # When False, all per-step/per-move prints are skipped; the optimizer
+        # runs thousands of silent simulations and the I/O otherwise adds up
+        self.verbose = verbose
+        # Command queues per robot; deques give O(1) dequeue from the front
+        self.robot_commands = defaultdict(deque)
+        # Total queued commands across all robots, kept in sync by the
+        # add/clear/dequeue paths so queue-status checks are O(1)
+        self._pending_total = 0
         self.step_count = 0
-    
-    def generate_path_commands(self, robot_id, is_replanning=False):
+        # Robots not yet at their target, kept current as moves land so the
+        # per-step completion checks don't rescan the fleet
+        self.unfinished_count = self._count_unfinished()
+        # Distance-to-goal fields shared by all robots heading to the same
+        # goal, invalidated when the warehouse layout changes
+        self._dist_fields = {}
+        self._dist_fields_version = -1
+
+    def _count_unfinished(self):
+        """Recount robots that are not at their target yet."""
+        return int(np.any(self.warehouse.robot_pos != self.warehouse.robot_target,
+                          axis=1).sum())
+    
+    def generate_path_commands(self, robot, is_replanning=False, positions=None):
         """
         Generates a path for a robot using A* and adds the corresponding
         movement commands to its queue.
+
+        Args:
+            robot (Robot): The robot to plan for. Callers always have the
+                object in hand, so no id lookup is needed here.
+            positions (dict, optional): Snapshot of all robot positions; taken
+                fresh when omitted, so callers planning several robots in the
+                same step can share one snapshot.
         """
-        robot = self.warehouse.get_robot_by_id(robot_id)
-        if not robot:
-            print(f"Robot {robot_id} not found.")
-            return
+        robot_id = robot.robot_id
 
         # Clear old commands before generating a new path, especially for re-planning
         if robot_id in self.robot_commands:
+            self._pending_total -= len(self.robot_commands[robot_id])
             self.robot_commands[robot_id].clear()
 
         start = robot.get_current_position()
         goal = robot.get_target_position()
-        
-        # Get current positions of all robots for collision avoidance
-        all_robot_positions = self.warehouse.get_robot_positions()
 
-        # Find the path using A*
-        path = a_star_search(self.warehouse, start, goal, robot_id, all_robot_positions)
+        # Current positions of all robots for collision avoidance
+        all_robot_positions = positions if positions is not None else self.warehouse.get_robot_positions()
+
+        # Find the path using A*, guided by the cached distance field
+        path = a_star_search(self.warehouse, start, goal, robot_id, all_robot_positions,
+                             heuristic_field=self._get_distance_field(goal))
 
         if path and len(path) > 1:
             # Convert path (list of coordinates) to movement commands
             directions = self.convert_path_to_directions(path)
             self.add_commands(robot_id, directions)
-            if is_replanning:
-                print(f"Re-planned path for {robot_id} from {start} to {goal} with {len(directions)} moves.")
-            else:
-                print(f"Path found for {robot_id} from {start} to {goal} with {len(directions)} moves.")
-        else:
+            if self.verbose:
+                if is_replanning:
+                    print(f"Re-planned path for {robot_id} from {start} to {goal} with {len(directions)} moves.")
+                else:
+                    print(f"Path found for {robot_id} from {start} to {goal} with {len(directions)} moves.")
+        elif self.verbose:
             if is_replanning:
                 print(f"Could not find a new path for {robot_id} from {start} to {goal}. Waiting.")
             else:
                 print(f"No path found for {robot_id} from {start} to {goal}.")
 
+    def _get_distance_field(self, goal):
+        """
+        BFS distance-to-goal field used as an exact A* heuristic. Computed
+        once per distinct goal and reused across robots and replans until
+        the layout changes; returns None without numba.
+        """
+        if not fast_sim.NUMBA_AVAILABLE:
+            return None
+        version = self.warehouse._layout_version
+        if version != self._dist_fields_version:
+            self._dist_fields.clear()
+            self._dist_fields_version = version
+        field = self._dist_fields.get(goal)
+        if field is None:
+            field = compute_distance_field(self.warehouse, goal)
+            self._dist_fields[goal] = field
+        return field
+
     def convert_path_to_directions(self, path):
         """
-        Converts a list of (x, y) coordinates to a list of movement directions.
-        
+        Converts a list of (x, y) coordinates to a list of direction codes.
+
         Args:
             path (list): A list of (x, y) tuples.
-            
+
         Returns:
-            list: A list of direction strings ("up", "down", "left", "right").
+            list: A list of integer direction codes (see fast_sim.DIRECTION_CODES).
         """
         directions = []
         for i in range(len(path) - 1):
             current_pos = path[i]
             next_pos = path[i+1]
-            
+
             dx = next_pos[0] - current_pos[0]
             dy = next_pos[1] - current_pos[1]
-            
-            if dx == 1:
-                directions.append("right")
-            elif dx == -1:
-                directions.append("left")
-            elif dy == 1:
-                directions.append("down")
-            elif dy == -1:
-                directions.append("up")
+
+            code = _DIR_FROM_DELTA[dx + 1][dy + 1]
+            if code is not None:
+                directions.append(code)
         return directions
     
     def add_command(self, robot_id, direction):
         """
         Args:
             robot_id (str): ID of the robot
-            direction (str): Direction to move ("up", "down", "left", "right")
+            direction (str or int): Direction to move ("up", "down", "left",
+                "right") or the equivalent integer code
         """
-        if robot_id not in self.robot_commands:
-            self.robot_commands[robot_id] = []
-        
-        self.robot_commands[robot_id].append(direction)
+        self.robot_commands[robot_id].append(fast_sim.DIRECTION_CODES.get(direction, direction))
+        self._pending_total += 1
     
     def add_commands(self, robot_id, directions):
         """
@@ -97,12 +145,12 @@ class RobotController:
         
         Args:
             robot_id (str): ID of the robot
-            directions (list): List of directions to move
+            directions (list): List of directions to move (strings or codes)
         """
-        if robot_id not in self.robot_commands:
-            self.robot_commands[robot_id] = []
-        
-        self.robot_commands[robot_id].extend(directions)
+        queue = self.robot_commands[robot_id]
+        before = len(queue)
+        queue.extend(fast_sim.DIRECTION_CODES.get(d, d) for d in directions)
+        self._pending_total += len(queue) - before
     
     def add_command_dict(self, command_dict):
         """
@@ -115,83 +163,142 @@ class RobotController:
             self.add_commands(robot_id, directions)
     
     
+    def _step_robots_fast(self, robots, pending):
+        """
+        Resolve one movement step for all robots at once using the compiled
+        fast_sim kernel, then apply the outcomes to the robot objects.
+        """
+        # The warehouse already holds positions SoA-style; the kernel updates
+        # the rows of successful movers in place
+        pos = self.warehouse.robot_pos
+        codes = np.array([-1 if direction is None else direction
+                          for direction in pending], dtype=np.int8)
+        passable = self.warehouse.get_passability_mask()
+
+        success = fast_sim.step_all(pos, codes, passable)
+
+        for i, robot in enumerate(robots):
+            if pending[i] is None:
+                continue
+            if success[i]:
+                robot._apply_successful_move(int(pos[i, 0]), int(pos[i, 1]))
+            else:
+                robot._apply_blocked_attempt()
+        return success
+
+    def _execute_move(self, robot, direction):
+        """Pure-Python movement dispatch, used when numba is not available."""
+        table = robot._move_table
+        if table is None:
+            # Bind the move methods once per robot, indexed by direction code
+            table = robot._move_table = (robot.move_up, robot.move_down,
+                                         robot.move_left, robot.move_right)
+        return table[direction]()
+
     def execute_one_step(self):
         """
         Execute one movement step for all robots that have commands queued.
         If a robot is blocked, it will attempt to re-plan its path.
-        
+
         Returns:
             bool: True if any robot moved, False if no movements occurred
         """
         self.step_count += 1
-        print(f"\n--- Step {self.step_count} ---")
-        
+        if self.verbose:
+            print(f"\n--- Step {self.step_count} ---")
+
         movements_made = 0
         robots_with_commands = 0
-        
-        robots_to_replan = []
 
-        for robot in self.warehouse.active_robots:
+        robots_to_replan = set()
+
+        active_robots = self.warehouse.active_robots
+        positions_snapshot = self.warehouse.get_robot_positions()
+
+        # If a robot has no commands but hasn't reached its target, generate a path
+        for robot in active_robots:
+            if not self.robot_commands.get(robot.robot_id) and not robot.is_at_target():
+                self.generate_path_commands(robot, positions=positions_snapshot)
+
+        # Peek at the next command for every robot (None = nothing queued)
+        pending = [self.robot_commands[robot.robot_id][0]
+                   if self.robot_commands.get(robot.robot_id) else None
+                   for robot in active_robots]
+        old_positions = [robot.get_current_position() for robot in active_robots]
+
+        # Resolve all movements, in one kernel call when numba is available,
+        # and record the tick's congestion in one batched pass right after
+        if fast_sim.NUMBA_AVAILABLE and active_robots:
+            successes = self._step_robots_fast(active_robots, pending)
+            batch_counts = self.warehouse.record_congestion_batch(
+                self.warehouse.robot_pos, successes)
+        else:
+            successes = [direction is not None and self._execute_move(robot, direction)
+                         for robot, direction in zip(active_robots, pending)]
+            batch_counts = None
+
+        for i, robot in enumerate(active_robots):
+            direction = pending[i]
+            if direction is None:
+                continue
             robot_id = robot.robot_id
-            
-            # If a robot has no commands but hasn't reached its target, generate a path
-            if not self.robot_commands.get(robot_id) and not robot.is_at_target():
-                self.generate_path_commands(robot_id)
-
-            # Check if robot has commands queued
-            if robot_id in self.robot_commands and self.robot_commands[robot_id]:
-                robots_with_commands += 1
-                direction = self.robot_commands[robot_id][0]  # Peek at next command
-                old_pos = robot.get_current_position()
-                
-                # Execute movement
-                success = False
-                if direction == "up":
-                    success = robot.move_up()
-                elif direction == "down":
-                    success = robot.move_down()
-                elif direction == "left":
-                    success = robot.move_left()
-                elif direction == "right":
-                    success = robot.move_right()
-                
-                if success:
-                    self.robot_commands[robot_id].pop(0)  # Remove command only on success
-                    new_pos = robot.get_current_position()
-                    
-                    # Record congestion
-                    self.warehouse.record_congestion(new_pos[0], new_pos[1])
-                    
-                    # Add congestion penalty and check for re-planning
-                    congestion_level = self.warehouse.get_congestion(new_pos[0], new_pos[1])
-                    if congestion_level > 1:
-                        # Apply a small penalty for moving into a congested cell
-                        penalty = 1 * (congestion_level - 1)
-                        robot.add_congestion_penalty(penalty)
-                        
-                        # Re-plan if moving into a congested area
+            robots_with_commands += 1
+            old_pos = old_positions[i]
+
+            if successes[i]:
+                self.robot_commands[robot_id].popleft()  # Remove command only on success
+                self._pending_total -= 1
+                new_pos = robot.get_current_position()
+
+                # Keep the unfinished counter in sync with moves onto (or,
+                # after a mid-run retarget, off) the robot's target
+                target = robot.get_target_position()
+                if new_pos == target:
+                    self.unfinished_count -= 1
+                elif old_pos == target:
+                    self.unfinished_count += 1
+
+                # The kernel path already recorded the whole tick's visits
+                # in one batch; the fallback records per robot here
+                if batch_counts is not None:
+                    congestion_level = int(batch_counts[i])
+                else:
+                    congestion_level = self.warehouse.record_and_get_congestion(
+                        new_pos[0], new_pos[1])
+                if congestion_level > 1:
+                    # Apply a small penalty for moving into a congested cell
+                    penalty = 1 * (congestion_level - 1)
+                    robot.add_congestion_penalty(penalty)
+
+                    # Re-plan if moving into a congested area
+                    if self.verbose:
                         print(f"{robot_id}: Moved into congested area at {new_pos}. Re-planning path.")
-                        if robot_id not in robots_to_replan:
-                            robots_to_replan.append(robot_id)
+                    robots_to_replan.add(robot)
 
-                    print(f"{robot_id}: {old_pos} → {new_pos} (moved {direction})")
-                    movements_made += 1
-                else:
-                    print(f"{robot_id}: Blocked trying to move {direction}. Re-planning path.")
-                    if robot_id not in robots_to_replan:
-                        robots_to_replan.append(robot_id)
-        
-        # Re-plan paths for blocked robots after all other robots have attempted to move
-        if robots_to_replan:
-            for robot_id in robots_to_replan:
-                self.generate_path_commands(robot_id, is_replanning=True)
+                if self.verbose:
+                    print(f"{robot_id}: {old_pos} → {new_pos} (moved {fast_sim.DIRECTION_NAMES[direction]})")
+                movements_made += 1
+            else:
+                if self.verbose:
+                    print(f"{robot_id}: Blocked trying to move {fast_sim.DIRECTION_NAMES[direction]}. Re-planning path.")
+                robots_to_replan.add(robot)
 
-        if robots_with_commands == 0 and not any(not r.is_at_target() for r in self.warehouse.active_robots):
-            print("All robots have completed their tasks.")
+        # Re-plan paths for blocked robots after all other robots have attempted
+        # to move; retake the snapshot since positions changed above
+        if robots_to_replan:
+            positions_snapshot = self.warehouse.get_robot_positions()
+            for robot in robots_to_replan:
+                self.generate_path_commands(robot, is_replanning=True,
+                                            positions=positions_snapshot)
+
+        if robots_with_commands == 0 and not self.unfinished_count:
+            if self.verbose:
+                print("All robots have completed their tasks.")
             return False
-        
+
         if movements_made == 0 and robots_with_commands > 0 and not robots_to_replan:
-            print("Gridlock detected: No robots could move, and no re-planning was possible.")
+            if self.verbose:
+                print("Gridlock detected: No robots could move, and no re-planning was possible.")
             return False
             
         return True
@@ -204,20 +311,25 @@ class RobotController:
         # Reset congestion map at the start of a full execution run
         self.warehouse.reset_congestion()
         
-        # Initial path generation for all robots
+        # Initial path generation for all robots, sharing one position snapshot
+        positions_snapshot = self.warehouse.get_robot_positions()
         for robot in self.warehouse.get_active_robots():
             if not robot.is_at_target():
-                self.generate_path_commands(robot.robot_id)
+                self.generate_path_commands(robot, positions=positions_snapshot)
 
-        # Loop until all robots are at their targets or max_steps is reached
-        while any(not robot.is_at_target() for robot in self.warehouse.get_active_robots()):
+        # Loop until all robots are at their targets or max_steps is reached;
+        # recount once here in case targets changed since the last run
+        self.unfinished_count = self._count_unfinished()
+        while self.unfinished_count:
             if self.step_count > max_steps:
-                print(f"Simulation timed out after {max_steps} steps. Aborting.")
+                if self.verbose:
+                    print(f"Simulation timed out after {max_steps} steps. Aborting.")
                 break
             if not self.execute_one_step():
                 break
-        
-        print("\nAll movements completed or gridlock/timeout reached!")
+
+        if self.verbose:
+            print("\nAll movements completed or gridlock/timeout reached!")
     
     def get_queue_status(self):
         """
@@ -231,11 +343,12 @@ class RobotController:
     def clear_all_queues(self):
         """Clear all queued commands for all robots."""
         self.robot_commands.clear()
+        self._pending_total = 0
         self.step_count = 0
-    
+
     def get_total_queued_commands(self):
         """Get total number of commands across all robot queues."""
-        return sum(len(queue) for queue in self.robot_commands.values())
+        return self._pending_total
 
 
 def create_sample_warehouse():
@@ -276,51 +389,24 @@ def create_sample_warehouse():
     
     # Add storage areas (blocked positions to simulate shelving)
     # Avoid blocking the connector aisles (x=2,7,12,17) and main connector paths
-    
-    # Storage block 1 (left side)
-    for x in range(0, 2):
-        for y in range(3, 6):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 2 (between connectors)
-    for x in range(5, 7):
-        for y in range(3, 6):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 3 (between connectors)
-    for x in range(10, 12):
-        for y in range(3, 6):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 4 (between connectors)  
-    for x in range(15, 17):
-        for y in range(3, 6):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 5 (left side)
-    for x in range(0, 2):
-        for y in range(8, 11):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 6 (between connectors)
-    for x in range(5, 7):
-        for y in range(8, 11):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 7 (between connectors)
-    for x in range(10, 12):
-        for y in range(8, 11):
-            warehouse.add_blocked_position(x, y)
-    
-    # Storage block 8 (between connectors)
-    for x in range(15, 17):
-        for y in range(8, 11):
-            warehouse.add_blocked_position(x, y)
-    
+    # Each block is an x-range × y-range rectangle, added in one batched call
+    storage_blocks = [
+        ((0, 2), (3, 6)),    # Storage block 1 (left side)
+        ((5, 7), (3, 6)),    # Storage block 2 (between connectors)
+        ((10, 12), (3, 6)),  # Storage block 3 (between connectors)
+        ((15, 17), (3, 6)),  # Storage block 4 (between connectors)
+        ((0, 2), (8, 11)),   # Storage block 5 (left side)
+        ((5, 7), (8, 11)),   # Storage block 6 (between connectors)
+        ((10, 12), (8, 11)), # Storage block 7 (between connectors)
+        ((15, 17), (8, 11)), # Storage block 8 (between connectors)
+    ]
+    for (x0, x1), (y0, y1) in storage_blocks:
+        warehouse.add_blocked_positions(product(range(x0, x1), range(y0, y1)))
+
     return warehouse
 
 
-def create_random_warehouse(width, height, num_robots, storage_density=0.8):
+def create_random_warehouse(width, height, num_robots, storage_density=0.8, rng=None):
     """
     Generates a warehouse with a randomized layout.
 
@@ -329,22 +415,26 @@ def create_random_warehouse(width, height, num_robots, storage_density=0.8):
         height (int): The height of the warehouse.
         num_robots (int): The number of robots, used to determine the number of docks/stations.
         storage_density (float): The percentage of non-aisle space to be filled with storage.
+        rng (numpy.random.Generator, optional): Random source; pass a seeded
+            generator for reproducible layouts (e.g. one per optimizer chain).
 
     Returns:
         Warehouse: A new warehouse instance with a random layout.
     """
+    if rng is None:
+        rng = np.random.default_rng()
     warehouse = Warehouse(width, height)
-    
+
     num_docks = num_robots
     num_stations = num_robots
 
     # --- Create Docks and Packing Stations ---
     # Ensure they don't overlap and have some spacing
-    available_x_dock = list(range(1, width - 1))
-    dock_xs = sorted(random.sample(available_x_dock, min(num_docks, len(available_x_dock))))
-    
-    available_x_station = list(range(1, width - 1))
-    station_xs = sorted(random.sample(available_x_station, min(num_stations, len(available_x_station))))
+    available_x = np.arange(1, width - 1)
+    dock_xs = sorted(rng.choice(available_x, size=min(num_docks, len(available_x)),
+                                replace=False, shuffle=False).tolist())
+    station_xs = sorted(rng.choice(available_x, size=min(num_stations, len(available_x)),
+                                   replace=False, shuffle=False).tolist())
 
     dock_positions = []
     for i, x in enumerate(dock_xs):
@@ -367,20 +457,24 @@ def create_random_warehouse(width, height, num_robots, storage_density=0.8):
 
     # Create a few horizontal aisles for connectivity
     num_horizontal_aisles = min(height // 4, 4)
-    available_y_aisle = list(range(2, height - 2))
-    aisle_ys = random.sample(available_y_aisle, min(num_horizontal_aisles, len(available_y_aisle)))
+    available_y = np.arange(2, height - 2)
+    aisle_ys = rng.choice(available_y, size=min(num_horizontal_aisles, len(available_y)),
+                          replace=False, shuffle=False).tolist()
     for i, y in enumerate(aisle_ys):
         warehouse.add_aisle(0, y, width - 1, y, f"H_AISLE_{i}")
 
     # --- Create Storage Areas ---
-    for x in range(width):
-        for y in range(height):
-            # Check if the position is already part of an aisle, dock, or station
-            if not warehouse.is_position_in_aisle(x, y):
-                # Add storage with a certain probability
-                if random.random() < storage_density:
-                    warehouse.add_blocked_position(x, y)
-    
+    # Build an aisle mask with array broadcasting instead of querying every cell,
+    # then draw the whole storage field in one vectorized pass.
+    aisle_mask = np.zeros((width, height), dtype=bool)
+    if all_aisle_xs:
+        aisle_mask[np.asarray(all_aisle_xs), :] = True
+    if aisle_ys:
+        aisle_mask[:, np.asarray(aisle_ys)] = True
+
+    storage_mask = ~aisle_mask & (rng.random((width, height)) < storage_density)
+    warehouse.add_blocked_positions(map(tuple, np.argwhere(storage_mask).tolist()))
+
     return warehouse, dock_positions, station_positions
 
 
@@ -408,27 +502,32 @@ def simulate_robot_movement_with_astar(warehouse, initial_positions, visualize=T
     """
     Simulate robot movement using A* pathfinding.
     """
-    print(f"\n" + "=" * 60)
-    print(f"SIMULATING ROBOT MOVEMENT (A* PATHFINDING)")
-    print("=" * 60)
-    
-    # Create robot controller and store initial positions
-    controller = RobotController(warehouse)
+    if visualize:
+        print(f"\n" + "=" * 60)
+        print(f"SIMULATING ROBOT MOVEMENT (A* PATHFINDING)")
+        print("=" * 60)
+
+    # Create robot controller and store initial positions; optimizer runs
+    # (visualize=False) are silent so stdout I/O never dominates them
+    controller = RobotController(warehouse, verbose=visualize)
     controller.initial_positions = initial_positions
-    
+
     # Generate paths for all robots
-    print("\n=== Generating Paths with A* ===")
+    if visualize:
+        print("\n=== Generating Paths with A* ===")
     for robot in warehouse.get_active_robots():
-        controller.generate_path_commands(robot.robot_id)
-    
-    print(f"\nInitial queue status: {controller.get_queue_status()}")
-    print(f"Total queued commands: {controller.get_total_queued_commands()}")
-    
-    # Execute all commands
-    print(f"\n=== Executing All Commands ===")
+        controller.generate_path_commands(robot)
+
+    if visualize:
+        print(f"\nInitial queue status: {controller.get_queue_status()}")
+        print(f"Total queued commands: {controller.get_total_queued_commands()}")
+
+        # Execute all commands
+        print(f"\n=== Executing All Commands ===")
     controller.execute_all_steps()
-    
-    print(f"\nFinal queue status: {controller.get_queue_status()}")
+
+    if visualize:
+        print(f"\nFinal queue status: {controller.get_queue_status()}")
     
     if visualize:
         # Final robot positions and energy consumption
@@ -5,17 +5,33 @@ The optimizer attempts to find a layout that minimizes a weighted cost function
 of travel distance, congestion, and energy usage.
 """
 
+import logging
 import random
 import math
-import copy
+import multiprocessing
+import os
+import numpy as np
+from sortedcontainers import SortedKeyList
 from main import simulate_robot_movement_with_astar
 from warehouse import Warehouse
 
+log = logging.getLogger(__name__)
+
+# Memoized evaluate_layout results keyed by layout fingerprint. SA revisits
+# layouts whenever a swap is toggled back, and the simulation below is made
+# deterministic per layout, so recomputation would just repeat the same run.
+_LAYOUT_CACHE = {}
+
+
 def evaluate_layout(warehouse, num_robots):
     """
     Runs a full simulation for a given warehouse layout and returns performance metrics.
     This is the objective function for our optimization.
 
+    Results are cached per (blocked set, num_robots) fingerprint; the
+    dock/station assignment is seeded from the same fingerprint so the
+    metrics really are a pure function of the layout.
+
     Args:
         warehouse (Warehouse): The warehouse layout to evaluate.
         num_robots (int): The number of robots to use in the simulation.
@@ -23,6 +39,11 @@ def evaluate_layout(warehouse, num_robots):
     Returns:
         dict: A dictionary containing performance metrics for the layout.
     """
+    key = (frozenset(warehouse.blocked_positions), num_robots)
+    cached = _LAYOUT_CACHE.get(key)
+    if cached is not None:
+        return dict(cached)
+
     # The simulation needs robots. We need to add them based on the layout's docks/stations.
     docks = warehouse.get_entry_docks()
     stations = warehouse.get_packing_stations()
@@ -30,11 +51,14 @@ def evaluate_layout(warehouse, num_robots):
     dock_positions = [d['position'] for d in docks]
     station_positions = [s['position'] for s in stations]
 
-    random.shuffle(dock_positions)
-    random.shuffle(station_positions)
+    # Seeded from the fingerprint (tuple hashes are unsalted), not the global
+    # RNG, so the same layout always gets the same robot assignment
+    rng = random.Random(hash(key))
+    rng.shuffle(dock_positions)
+    rng.shuffle(station_positions)
 
     # Ensure the warehouse is clean before evaluation
-    warehouse.active_robots.clear()
+    warehouse.clear_robots()
     warehouse.reset_congestion()
 
     # Create and place robots
@@ -61,13 +85,15 @@ def evaluate_layout(warehouse, num_robots):
         total_distance += report['successful_moves']
         total_energy += report['total_energy_spent']
         
-    max_congestion = max(warehouse.congestion_map.values()) if warehouse.congestion_map else 0
+    max_congestion = warehouse.get_max_congestion()
     
     metrics = {
         "total_distance": total_distance,
         "total_energy": total_energy,
         "max_congestion": max_congestion,
     }
+    # Store a copy so archive entries and cache never alias the same dict
+    _LAYOUT_CACHE[key] = dict(metrics)
     return metrics
 
 def calculate_cost(metrics, weights):
@@ -79,99 +105,246 @@ def calculate_cost(metrics, weights):
             weights['w_e'] * metrics['total_energy'])
     return cost
 
+
+def make_cost_fn(weights):
+    """
+    Specializes calculate_cost for fixed weights: the three weight lookups
+    happen once here, and the returned closure only reads the metrics.
+    """
+    w_d, w_c, w_e = weights['w_d'], weights['w_c'], weights['w_e']
+
+    def cost(metrics):
+        return (w_d * metrics['total_distance'] +
+                w_c * metrics['max_congestion'] +
+                w_e * metrics['total_energy'])
+
+    return cost
+
 def get_neighbor_layout(warehouse):
     """
-    Generates a new layout by making a small, random change to the current one.
-    It swaps a random storage cell with a random, non-essential aisle cell,
-    ensuring the aisle data structure is correctly updated.
+    Mutates the warehouse into a neighboring layout by swapping a random
+    storage cell with a random, non-essential aisle cell. The swap is applied
+    in place (no deepcopy) and a swap record is returned that undo_neighbor
+    can use to reverse it exactly; returns None when no swap is possible.
     """
-    new_warehouse = copy.deepcopy(warehouse)
-    
-    # Find candidate cells for swapping
-    # Ensure we don't move docks/stations which are also in blocked_positions
-    infrastructure_cells = {d['position'] for d in new_warehouse.entry_docks} | \
-                           {s['position'] for s in new_warehouse.packing_stations}
-    
-    storage_cells = [cell for cell in new_warehouse.blocked_positions if cell not in infrastructure_cells]
-    
-    # Get a flat list of all aisle positions that are not infrastructure
-    aisle_cells = []
-    for aisle in new_warehouse.aisles:
-        for pos in aisle['positions']:
-            if pos not in infrastructure_cells:
-                aisle_cells.append(pos)
-    
+    # Candidate cells are maintained incrementally by the warehouse:
+    # storage candidates are blocked-but-not-infrastructure cells, aisle
+    # candidates are walkable, unblocked non-infrastructure cells. Docks
+    # and stations are never offered for swapping.
+    storage_cells = warehouse._storage_cells
+    aisle_cells = warehouse._aisle_cells
+
     if not storage_cells or not aisle_cells:
-        return new_warehouse # Cannot make a swap
+        return None  # Cannot make a swap
 
     # Choose random cells to swap
     storage_to_become_aisle = random.choice(storage_cells)
     aisle_to_become_storage = random.choice(aisle_cells)
 
-    # Perform the swap in the blocked_positions set
-    new_warehouse.remove_blocked_position(storage_to_become_aisle[0], storage_to_become_aisle[1])
-    new_warehouse.add_blocked_position(aisle_to_become_storage[0], aisle_to_become_storage[1])
-    
+    # Perform the swap as two O(1) in-place cell toggles
+    warehouse.toggle_blocked(storage_to_become_aisle[0], storage_to_become_aisle[1])
+    warehouse.toggle_blocked(aisle_to_become_storage[0], aisle_to_become_storage[1])
+
     # Update the aisle data structure to reflect the change
     # Find which aisle contained the old aisle position and replace it with the new one.
     # This is a simple but more robust way to handle the swap.
-    found_and_swapped = False
-    for aisle in new_warehouse.aisles:
+    aisle_index = None
+    for i, aisle in enumerate(warehouse.aisles):
         if aisle_to_become_storage in aisle['positions']:
-            aisle['positions'].remove(aisle_to_become_storage)
-            aisle['positions'].append(storage_to_become_aisle)
-            found_and_swapped = True
+            aisle['positions'].discard(aisle_to_become_storage)
+            aisle['positions'].add(storage_to_become_aisle)
+            aisle_index = i
             break
-    
+
     # If the aisle cell wasn't in a specific aisle for some reason, add it to a general one
-    if not found_and_swapped and new_warehouse.aisles:
-        new_warehouse.aisles[0]['positions'].append(storage_to_become_aisle)
+    if aisle_index is None and warehouse.aisles:
+        warehouse.aisles[0]['positions'].add(storage_to_become_aisle)
+
+    # Keep the walkability mask in sync with the swap. The removed cell may
+    # sit on an aisle intersection and still belong to another aisle.
+    storage_prev_mask = int(warehouse.aisle_mask[storage_to_become_aisle[0],
+                                                 storage_to_become_aisle[1]])
+    warehouse.aisle_mask[storage_to_become_aisle[0], storage_to_become_aisle[1]] = 1
+    aisle_mask_cleared = False
+    if not any(aisle_to_become_storage in aisle['positions'] for aisle in warehouse.aisles):
+        warehouse.aisle_mask[aisle_to_become_storage[0], aisle_to_become_storage[1]] = 0
+        aisle_mask_cleared = True
 
-    return new_warehouse
+    # The direct mask writes above may change candidate membership too
+    warehouse._sync_candidates(*storage_to_become_aisle)
+    warehouse._sync_candidates(*aisle_to_become_storage)
+
+    return {
+        'storage_cell': storage_to_become_aisle,
+        'aisle_cell': aisle_to_become_storage,
+        'aisle_index': aisle_index,
+        'storage_prev_mask': storage_prev_mask,
+        'aisle_mask_cleared': aisle_mask_cleared,
+    }
+
+
+def undo_neighbor(warehouse, swap_record):
+    """
+    Reverses a swap applied by get_neighbor_layout, restoring the blocked
+    set, aisle lists and walkability mask. Safe to call with None (no swap).
+    """
+    if swap_record is None:
+        return
+
+    storage_cell = swap_record['storage_cell']
+    aisle_cell = swap_record['aisle_cell']
+
+    # toggle_blocked is its own inverse
+    warehouse.toggle_blocked(storage_cell[0], storage_cell[1])
+    warehouse.toggle_blocked(aisle_cell[0], aisle_cell[1])
+
+    aisle_index = swap_record['aisle_index']
+    if aisle_index is not None:
+        positions = warehouse.aisles[aisle_index]['positions']
+        positions.discard(storage_cell)
+        positions.add(aisle_cell)
+    elif warehouse.aisles:
+        warehouse.aisles[0]['positions'].discard(storage_cell)
+
+    warehouse.aisle_mask[storage_cell[0], storage_cell[1]] = swap_record['storage_prev_mask']
+    if swap_record['aisle_mask_cleared']:
+        warehouse.aisle_mask[aisle_cell[0], aisle_cell[1]] = 1
+    warehouse._sync_candidates(*storage_cell)
+    warehouse._sync_candidates(*aisle_cell)
 
 def simulated_annealing_optimizer(initial_warehouse, num_robots, weights, temp, cool_rate, iters):
     """
     Optimizes warehouse layout using Simulated Annealing for a single objective.
     """
-    print("\nStarting Single-Objective Simulated Annealing Optimization...")
+    log.info("Starting Single-Objective Simulated Annealing Optimization...")
     
     current_solution = initial_warehouse
+    cost_fn = make_cost_fn(weights)  # Weights are fixed for the whole run
     current_metrics = evaluate_layout(current_solution, num_robots)
-    current_cost = calculate_cost(current_metrics, weights)
-    
-    best_solution = current_solution
+    current_cost = cost_fn(current_metrics)
+
     best_metrics = current_metrics
     best_cost = current_cost
-    
+
+    # Accepted swaps since the best layout was current; rewinding them at the
+    # end restores the best layout without ever copying the warehouse
+    swaps_since_best = []
+
     history = {'temp': [], 'cost': []}
 
     for i in range(iters):
-        neighbor = get_neighbor_layout(current_solution)
-        neighbor_metrics = evaluate_layout(neighbor, num_robots)
-        neighbor_cost = calculate_cost(neighbor_metrics, weights)
-        
-        # Acceptance probability
+        # Mutate the current layout in place; the swap record lets us
+        # reverse the change if the move is rejected
+        swap = get_neighbor_layout(current_solution)
+        neighbor_metrics = evaluate_layout(current_solution, num_robots)
+        neighbor_cost = cost_fn(neighbor_metrics)
+
+        # Acceptance probability. u < exp(-diff/temp) is equivalent to
+        # diff < -temp*log(u), which trades the exp per rejected trial for a
+        # log; 1 - random() keeps the argument in (0, 1] so log never sees 0.
         cost_diff = neighbor_cost - current_cost
-        
-        if cost_diff < 0 or random.uniform(0, 1) < math.exp(-cost_diff / temp):
-            current_solution = neighbor
+
+        if cost_diff < 0 or cost_diff < -temp * math.log(1.0 - random.random()):
             current_cost = neighbor_cost
             current_metrics = neighbor_metrics
-        
+            swaps_since_best.append(swap)
+        else:
+            undo_neighbor(current_solution, swap)
+
         if current_cost < best_cost:
-            best_solution = current_solution
+            swaps_since_best.clear()
             best_cost = current_cost
             best_metrics = current_metrics
-            
+
         # Update history and cool down
         history['temp'].append(temp)
         history['cost'].append(current_cost)
         temp *= cool_rate
         
-        print(f"Iter {i+1}/{iters} | Temp: {temp:.2f} | Current Cost: {current_cost:.2f} | Best Cost: {best_cost:.2f}")
+        # %-style logging defers formatting until a handler actually emits
+        log.debug("Iter %d/%d | Temp: %.2f | Current Cost: %.2f | Best Cost: %.2f",
+                  i + 1, iters, temp, current_cost, best_cost)
+
+    log.info("Simulated Annealing complete.")
+
+    # Rewind the accepted-but-not-best tail so the shared warehouse ends up
+    # in the best layout found, and return it as the result
+    for swap in reversed(swaps_since_best):
+        undo_neighbor(current_solution, swap)
+    return current_solution, best_metrics, history
+
+
+def _sa_chain_worker(args):
+    """Run one seeded SA chain in a worker process (must stay picklable)."""
+    seed, initial_warehouse, num_robots, weights, temp, cool_rate, iters = args
+    random.seed(seed)
+    np.random.seed(seed)
+    return simulated_annealing_optimizer(initial_warehouse, num_robots, weights,
+                                         temp, cool_rate, iters)
+
+
+def _mosa_chain_worker(args):
+    """Run one seeded MOSA chain in a worker process (must stay picklable)."""
+    seed, initial_warehouse, num_robots, temp, cool_rate, iters = args
+    random.seed(seed)
+    np.random.seed(seed)
+    return mosa_optimizer(initial_warehouse, num_robots, temp, cool_rate, iters)
+
+
+def _default_num_chains():
+    return min(os.cpu_count() or 1, 4)
+
 
-    print("Simulated Annealing complete.")
-    return best_solution, best_metrics, history
+def run_parallel_sa_chains(initial_warehouse, num_robots, weights, temp, cool_rate,
+                           iters, num_chains=None):
+    """
+    Runs several independently seeded SA chains in parallel processes and
+    returns the best layout found across all of them.
+
+    Each chain explores the landscape from the same initial layout but with
+    its own RNG stream, so this is a restart strategy that divides wall time
+    by the number of cores used.
+
+    Returns:
+        tuple: (best_layout, best_metrics, chain_histories) where
+            chain_histories is a list with one history dict per chain.
+    """
+    if num_chains is None:
+        num_chains = _default_num_chains()
+
+    chain_args = [(seed, initial_warehouse, num_robots, weights, temp, cool_rate, iters)
+                  for seed in range(num_chains)]
+    with multiprocessing.Pool(num_chains) as pool:
+        results = pool.map(_sa_chain_worker, chain_args)
+
+    best_solution, best_metrics, _ = min(
+        results, key=lambda result: calculate_cost(result[1], weights))
+    return best_solution, best_metrics, [history for _, _, history in results]
+
+
+def run_parallel_mosa_chains(initial_warehouse, num_robots, temp, cool_rate,
+                             iters, num_chains=None):
+    """
+    Runs several independently seeded MOSA chains in parallel processes and
+    merges their archives into a single non-dominated set.
+
+    Returns:
+        tuple: (merged_archive, chain_histories)
+    """
+    if num_chains is None:
+        num_chains = _default_num_chains()
+
+    chain_args = [(seed, initial_warehouse, num_robots, temp, cool_rate, iters)
+                  for seed in range(num_chains)]
+    with multiprocessing.Pool(num_chains) as pool:
+        results = pool.map(_mosa_chain_worker, chain_args)
+
+    # Union the per-chain archives and re-apply the non-dominated filter
+    merged_archive = new_archive()
+    for archive, _ in results:
+        for metrics in archive:
+            merged_archive = update_archive(merged_archive, metrics)
+    return merged_archive, [history for _, history in results]
 
 
 # --- Multi-Objective Optimization Functions ---
@@ -181,74 +354,97 @@ def dominates(metrics_a, metrics_b):
     Check if solution A dominates solution B.
     Minimize all objectives: distance, congestion, energy.
     """
-    a_better = False
-    for key in metrics_a:
-        if metrics_a[key] > metrics_b[key]:
-            return False  # A is worse in at least one objective
-        if metrics_a[key] < metrics_b[key]:
-            a_better = True  # A is strictly better in at least one
-    return a_better
+    # The objectives are fixed, so pull them out once and short-circuit
+    # instead of walking the dicts key by key; this runs O(iters × archive)
+    # times inside update_archive.
+    a0 = metrics_a['total_distance']
+    a1 = metrics_a['max_congestion']
+    a2 = metrics_a['total_energy']
+    b0 = metrics_b['total_distance']
+    b1 = metrics_b['max_congestion']
+    b2 = metrics_b['total_energy']
+    if a0 > b0 or a1 > b1 or a2 > b2:
+        return False  # A is worse in at least one objective
+    return a0 < b0 or a1 < b1 or a2 < b2  # A strictly better in at least one
+
+def _archive_key(metrics):
+    """Sort key for the Pareto archive (module-level so it pickles)."""
+    return metrics['total_distance']
+
+
+def new_archive():
+    """An empty Pareto archive, kept sorted by total_distance."""
+    return SortedKeyList(key=_archive_key)
+
 
 def update_archive(archive, new_solution_metrics):
     """
-    Updates the archive of non-dominated solutions.
+    Updates the archive of non-dominated solutions in place and returns it.
+
+    The archive is a SortedKeyList ordered by total_distance, so dominance
+    checks only scan the half of the archive that can matter: a dominator of
+    the new solution must have total_distance <= its own, and anything it
+    dominates must have total_distance >= its own.
     """
-    new_archive = []
-    is_dominated_by_new = False
-    
-    for old_metrics in archive:
-        if dominates(new_solution_metrics, old_metrics):
-            continue  # Old solution is dominated by new, so don't keep it
+    new_distance = _archive_key(new_solution_metrics)
+
+    for old_metrics in archive.irange_key(None, new_distance):
         if dominates(old_metrics, new_solution_metrics):
-            is_dominated_by_new = True
-            break # New solution is dominated by an existing one, so don't add it
-        new_archive.append(old_metrics)
-        
-    if not is_dominated_by_new:
-        new_archive.append(new_solution_metrics)
-        
-    return new_archive
+            # New solution is dominated by an existing one; the archive is
+            # unchanged (an archive member can never dominate another, so no
+            # old entries can be dominated by the new solution either).
+            return archive
+
+    dominated = [old_metrics for old_metrics in archive.irange_key(new_distance, None)
+                 if dominates(new_solution_metrics, old_metrics)]
+    for old_metrics in dominated:
+        archive.remove(old_metrics)
+
+    archive.add(new_solution_metrics)
+    return archive
 
 def mosa_optimizer(initial_warehouse, num_robots, temp, cool_rate, iters):
     """
     Optimizes warehouse layout using Multi-Objective Simulated Annealing (MOSA).
     Finds a set of Pareto-optimal solutions.
     """
-    print("\nStarting Multi-Objective Simulated Annealing (MOSA) Optimization...")
+    log.info("Starting Multi-Objective Simulated Annealing (MOSA) Optimization...")
     
     current_solution = initial_warehouse
     current_metrics = evaluate_layout(current_solution, num_robots)
     
     # The archive stores the metrics of the non-dominated solutions
-    archive = [current_metrics]
+    archive = update_archive(new_archive(), current_metrics)
     
     history = {'temp': [], 'archive_size': []}
 
     for i in range(iters):
-        # Generate a neighbor from the current solution
-        neighbor_layout = get_neighbor_layout(current_solution)
-        neighbor_metrics = evaluate_layout(neighbor_layout, num_robots)
-        
+        # Mutate the current layout in place; undo below if the move is rejected
+        swap = get_neighbor_layout(current_solution)
+        neighbor_metrics = evaluate_layout(current_solution, num_robots)
+
         # --- Acceptance Criterion ---
         # 1. If neighbor dominates current, always accept
         if dominates(neighbor_metrics, current_metrics):
-            current_solution = neighbor_layout
-            current_metrics = neighbor_metrics
+            accepted = True
         # 2. If non-dominated, accept based on temperature
         elif not dominates(current_metrics, neighbor_metrics):
             # This is a simplification. A more complex criterion could be used.
             # For now, we accept non-dominated moves with a probability.
-            if random.uniform(0, 1) < 0.5: # 50% chance to explore non-dominated solutions
-                current_solution = neighbor_layout
-                current_metrics = neighbor_metrics
+            accepted = random.uniform(0, 1) < 0.5 # 50% chance to explore non-dominated solutions
         # 3. If neighbor is dominated by current, accept with a small probability
         else:
             # Probability of accepting a worse solution
             # We need a way to quantify "how much worse" in a multi-objective context.
             # For simplicity, we use a fixed low probability, but this could be improved.
-            if random.uniform(0, 1) < math.exp(-1 / temp):
-                current_solution = neighbor_layout
-                current_metrics = neighbor_metrics
+            # Same log-form of the Metropolis test as the single-objective
+            # annealer: u < exp(-1/temp) without evaluating exp.
+            accepted = 1.0 < -temp * math.log(1.0 - random.random())
+
+        if accepted:
+            current_metrics = neighbor_metrics
+        else:
+            undo_neighbor(current_solution, swap)
 
         # Update the archive with the potentially new solution
         archive = update_archive(archive, neighbor_metrics)
@@ -258,7 +454,8 @@ def mosa_optimizer(initial_warehouse, num_robots, temp, cool_rate, iters):
         history['archive_size'].append(len(archive))
         temp *= cool_rate
         
-        print(f"Iter {i+1}/{iters} | Temp: {temp:.2f} | Archive Size: {len(archive)}")
+        log.debug("Iter %d/%d | Temp: %.2f | Archive Size: %d",
+                  i + 1, iters, temp, len(archive))
 
-    print("MOSA complete.")
+    log.info("MOSA complete.")
     return archive, history
@@ -1,4 +1,14 @@
 import heapq
+from collections import deque
+
+import numpy as np
+import fast_sim
+
+# Neighbor deltas (Up, Down, Right, Left), hoisted so the expansion loop
+# doesn't rebuild a list of tuples per node. A plain tuple beats an ndarray
+# here: the interpreter unpacks it without boxing NumPy scalars. The
+# compiled kernel uses fast_sim.DX/DY, which the JIT keeps in registers.
+_NEIGHBOR_DELTAS = ((0, 1), (0, -1), (1, 0), (-1, 0))
 
 def heuristic(a, b):
     """
@@ -6,16 +16,31 @@ def heuristic(a, b):
     """
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def a_star_search(warehouse, start, goal, robot_id, all_robot_positions, congestion_penalty=1):
+def compute_distance_field(warehouse, goal):
+    """
+    Compute the BFS distance-to-goal field for every cell of the warehouse,
+    ignoring robots and congestion. The field is an exact lower bound on the
+    remaining path cost, so it doubles as a perfect A* heuristic that can be
+    shared by every robot heading to the same goal. Returns None when the
+    compiled kernels are unavailable.
+    """
+    if not fast_sim.NUMBA_AVAILABLE:
+        return None
+    field = fast_sim.bfs_field(warehouse.get_passability_mask(), goal[0], goal[1])
+    return field.astype(np.float32)
+
+
+def a_star_search(warehouse, start, goal, robot_id, all_robot_positions,
+                  congestion_penalty=1, heuristic_field=None):
     """
     Find the optimal path from a start to a goal position using the A* algorithm.
-    
+
     This implementation considers:
     - Static obstacles (storage areas, walls).
     - Dynamic obstacles (other robots).
     - Movement constraints (robots must stay in aisles).
     - Congestion penalty for frequently used paths.
-    
+
     Args:
         warehouse (Warehouse): The warehouse instance.
         start (tuple): The starting position (x, y).
@@ -23,89 +48,284 @@ def a_star_search(warehouse, start, goal, robot_id, all_robot_positions, congest
         robot_id (str): The ID of the robot for which the path is being calculated.
         all_robot_positions (dict): A dictionary of current positions for all robots.
         congestion_penalty (float): The penalty multiplier for congested cells.
-        
+        heuristic_field (ndarray, optional): A cached distance field from
+            compute_distance_field for this goal; Manhattan distance is used
+            when omitted.
+
     Returns:
         list: A list of tuples representing the path from start to goal, or an empty list if no path is found.
     """
+    if fast_sim.NUMBA_AVAILABLE:
+        return _a_star_search_fast(warehouse, start, goal, robot_id,
+                                   all_robot_positions, congestion_penalty,
+                                   heuristic_field)
+    return _a_star_search_bidirectional(warehouse, start, goal, robot_id,
+                                        all_robot_positions,
+                                        congestion_penalty)
+
+
+def _a_star_search_fast(warehouse, start, goal, robot_id, all_robot_positions,
+                        congestion_penalty, heuristic_field=None):
+    """
+    Array-based A* through the compiled fast_sim kernel. Grid state is packed
+    into dense NumPy masks and nodes travel as flat x * height + y integers;
+    coordinates are only decoded back to tuples at this boundary.
+    """
+    width, height = warehouse.width, warehouse.height
+
+    passable = warehouse.get_passability_mask()
+    # The warehouse maintains the dense float32 mirror incrementally, so the
+    # kernel reads it as-is instead of repacking the dict on every search
+    congestion = warehouse.congestion_grid
+    occupied = np.zeros((width, height), dtype=np.uint8)
+    for rid, pos in all_robot_positions.items():
+        if rid != robot_id and warehouse.is_valid_position(pos[0], pos[1]):
+            occupied[pos[0], pos[1]] = 1
+
+    if heuristic_field is None:
+        # Manhattan distance to the goal, built in one broadcast
+        heuristic_field = (np.abs(np.arange(width) - goal[0])[:, None] +
+                           np.abs(np.arange(height) - goal[1])[None, :]).astype(np.float32)
+
+    flat_path = fast_sim.astar(passable, congestion, occupied, heuristic_field,
+                               start[0], start[1], goal[0], goal[1],
+                               float(congestion_penalty))
+    return [(int(node) // height, int(node) % height) for node in flat_path]
+
+
+def _build_passable(warehouse, goal, robot_id, all_robot_positions):
+    """
+    Fused walkability mask for one search: aisle/dock/station cells that are
+    not blocked by storage, with the goal cell OR'd in (paths may end on a
+    blocked dock) and cells under other robots cleared. One mask load then
+    replaces the separate bounds / blocked / in-aisle / occupied checks per
+    neighbor.
+    """
+    width, height = warehouse.width, warehouse.height
+    passable = warehouse.get_passability_mask().astype(bool)
+    if warehouse.is_valid_position(goal[0], goal[1]):
+        passable[goal] = True
+    for rid, pos in all_robot_positions.items():
+        if rid != robot_id and 0 <= pos[0] < width and 0 <= pos[1] < height:
+            passable[pos[0], pos[1]] = False
+    return passable
+
+
+def _a_star_search_python(warehouse, start, goal, robot_id, all_robot_positions, congestion_penalty):
+    """
+    Pure-Python single-direction A*. The bidirectional variant below is the
+    fallback actually dispatched to; this straightforward implementation is
+    kept as the reference oracle the optimized variants are checked against.
+    """
+    width, height = warehouse.width, warehouse.height
+
+    passable = _build_passable(warehouse, goal, robot_id, all_robot_positions)
+
+    # The state space is a bounded grid, so the per-node bookkeeping lives in
+    # dense arrays indexed [x, y] instead of dicts: no hashing, no PyObject
+    # keys, contiguous memory.
+    closed = np.zeros((warehouse.width, height), dtype=bool)
 
-    # The set of nodes already evaluated
-    closed_set = set()
-    
     # The set of currently discovered nodes that are not evaluated yet
     open_set = []
     heapq.heappush(open_set, (0, start))  # (f_score, position)
-    
-    # For each node, which node it can most efficiently be reached from
-    came_from = {}
-    
+
+    # For each node, the parent it is most efficiently reached from, packed
+    # as x * height + y with -1 meaning "no parent yet"
+    came_from = np.full((warehouse.width, height), -1, dtype=np.int32)
+
     # For each node, the cost of getting from the start node to that node
-    g_score = {start: 0}
-    
-    # For each node, the total cost of getting from the start node to the goal
-    # by passing by that node. The value is partly known, partly heuristic.
-    f_score = {start: heuristic(start, goal)}
-    
-    # Get positions of other robots to avoid collisions
-    other_robot_positions = {pos for rid, pos in all_robot_positions.items() if rid != robot_id}
+    g_score = np.full((warehouse.width, height), np.inf, dtype=np.float32)
+    g_score[start] = 0
+
+    # Bind the loop's attribute and global lookups to locals once: inside the
+    # while loop each becomes a LOAD_FAST instead of a dict lookup per call
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    get_congestion = warehouse.get_congestion
+    goal_x, goal_y = goal
 
     while open_set:
         # Get the node in open_set having the lowest f_score value
-        _, current = heapq.heappop(open_set)
-        
-        # If the goal is reached, reconstruct and return the path
+        f_popped, current = heappop(open_set)
+
+        # Duplicates are pushed freely below (lazy deletion); stale entries
+        # surface here after the node was already expanded and are skipped
+        if closed[current]:
+            continue
+
+        # A duplicate can also surface before its node is closed, when the
+        # node was relaxed again after this entry was pushed. The popped f
+        # then exceeds the best-known f, so the entry is stale and the
+        # cheaper copy still in the heap will do the expansion.
+        if f_popped > g_score[current] + abs(current[0] - goal_x) + abs(current[1] - goal_y):
+            continue
+
+        # If the goal is reached, reconstruct and return the path. Parents
+        # are prepended to a deque, which makes the walk a single pass with
+        # no reversed-slice copy at the end.
         if current == goal:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            return path[::-1]  # Return reversed path
-            
-        closed_set.add(current)
+            path = deque([current])
+            parent = int(came_from[current])
+            while parent >= 0:
+                path.appendleft((parent // height, parent % height))
+                parent = int(came_from[path[0]])
+            return list(path)
+
+        closed[current] = True
         
         # Explore neighbors
-        for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:  # Up, Down, Right, Left
+        for dx, dy in _NEIGHBOR_DELTAS:
             neighbor = (current[0] + dx, current[1] + dy)
-            
+
             # --- Collision and Validity Checks
-            # 1. Check if neighbor is within warehouse bounds
-            if not warehouse.is_valid_position(neighbor[0], neighbor[1]):
+            # 1. Check bounds inline (negative indices would wrap the arrays)
+            if not (0 <= neighbor[0] < width and 0 <= neighbor[1] < height):
                 continue
-            
+
             # 2. Check if neighbor is in the set of already evaluated nodes
-            if neighbor in closed_set:
-                continue
-            
-            # 3. Check if the neighbor is a blocked position (storage, etc.)
-            if warehouse.is_blocked_position(neighbor[0], neighbor[1]) and neighbor != goal:
-                continue
-            
-            # 4. Check if the neighbor is occupied by another robot
-            if neighbor in other_robot_positions:
+            if closed[neighbor]:
                 continue
-                
-            # 5. Check if the neighbor is in an aisle
-            if not warehouse.is_position_in_aisle(neighbor[0], neighbor[1]) and neighbor != goal:
+
+            # 3. One mask load covers blocked, non-aisle, robot-occupied and
+            #    the goal exemption
+            if not passable[neighbor]:
                 continue
 
             # --- A* Algorithm Logic with Congestion ---
             
             # Calculate congestion cost
-            congestion_cost = warehouse.get_congestion(neighbor[0], neighbor[1]) * congestion_penalty
+            congestion_cost = get_congestion(neighbor[0], neighbor[1]) * congestion_penalty
             #print(f"Neighbor: {neighbor}, Congestion Cost: {congestion_cost}")
             
             # The distance from start to a neighbor is the distance from start to current + 1 + congestion
             tentative_g_score = g_score[current] + 1 + congestion_cost
             
             # If this path to the neighbor is better than any previous one, record it
-            if tentative_g_score < g_score.get(neighbor, float('inf')):
-                came_from[neighbor] = current
+            if tentative_g_score < g_score[neighbor]:
+                came_from[neighbor] = current[0] * height + current[1]
                 g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + heuristic(neighbor, goal)
-                
-                # Add the neighbor to the open set if it's not already there
-                if neighbor not in [item[1] for item in open_set]:
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+
+                # Push unconditionally; scanning the heap for membership was
+                # O(open set) per relaxation and also left improved nodes
+                # stuck behind their old, worse f score
+                heappush(open_set,
+                         (tentative_g_score + abs(neighbor[0] - goal_x)
+                          + abs(neighbor[1] - goal_y), neighbor))
 
     # If the loop completes and the goal was not reached, return an empty list
     return []
+
+
+def _a_star_search_bidirectional(warehouse, start, goal, robot_id,
+                                 all_robot_positions, congestion_penalty):
+    """
+    Bidirectional A*, the pure-Python fallback when numba is not available.
+
+    Two searches run toward each other — forward from the start and backward
+    from the goal over reversed edges — each expanding roughly half the disk
+    a single search would, and stop once the cheapest open f value on either
+    side can no longer beat the best meeting found (the classic BHPA
+    criterion, valid for admissible heuristics). Entering cell v costs
+    1 + congestion(v) * penalty regardless of direction, so the backward
+    step cost is hoisted per expanded node.
+    """
+    width, height = warehouse.width, warehouse.height
+    if start == goal:
+        return [start]
+
+    passable = _build_passable(warehouse, goal, robot_id, all_robot_positions)
+    # The backward search must be able to finish on the start cell even when
+    # it is a blocked dock (the forward search never tests its own start)
+    if warehouse.is_valid_position(start[0], start[1]):
+        passable[start] = True
+
+    inf = np.inf
+    g_fwd = np.full((width, height), inf, dtype=np.float32)
+    g_bwd = np.full((width, height), inf, dtype=np.float32)
+    g_fwd[start] = 0
+    g_bwd[goal] = 0
+    closed_fwd = np.zeros((width, height), dtype=bool)
+    closed_bwd = np.zeros((width, height), dtype=bool)
+    parent_fwd = np.full((width, height), -1, dtype=np.int32)
+    parent_bwd = np.full((width, height), -1, dtype=np.int32)
+
+    open_fwd = [(heuristic(start, goal), start)]
+    open_bwd = [(heuristic(goal, start), goal)]
+
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    get_congestion = warehouse.get_congestion
+
+    best = inf      # Cost of the best start-goal path seen so far
+    meet = None     # Node where its two half-paths join
+
+    while open_fwd and open_bwd:
+        # Neither frontier can still contain a cheaper complete path
+        if max(open_fwd[0][0], open_bwd[0][0]) >= best:
+            break
+
+        # Expand the side whose cheapest open node is cheaper
+        forward = open_fwd[0][0] <= open_bwd[0][0]
+        open_set = open_fwd if forward else open_bwd
+        g_here, g_there = (g_fwd, g_bwd) if forward else (g_bwd, g_fwd)
+        closed = closed_fwd if forward else closed_bwd
+        parent = parent_fwd if forward else parent_bwd
+        target = goal if forward else start
+
+        f_popped, current = heappop(open_set)
+        if closed[current]:
+            continue
+        if f_popped > g_here[current] + heuristic(current, target):
+            continue  # Stale duplicate, a cheaper copy is still queued
+        closed[current] = True
+
+        if g_there[current] < inf:
+            total = g_here[current] + g_there[current]
+            if total < best:
+                best = total
+                meet = current
+
+        # Cost of traversing the forward edge into/out of this node: going
+        # forward each neighbor v costs 1 + congestion(v); going backward
+        # every predecessor pays the same fixed toll for entering current.
+        base_g = g_here[current]
+        back_toll = 1 + get_congestion(current[0], current[1]) * congestion_penalty
+
+        for dx, dy in _NEIGHBOR_DELTAS:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if not (0 <= neighbor[0] < width and 0 <= neighbor[1] < height):
+                continue
+            if closed[neighbor] or not passable[neighbor]:
+                continue
+
+            if forward:
+                step = 1 + get_congestion(neighbor[0], neighbor[1]) * congestion_penalty
+            else:
+                step = back_toll
+            tentative = base_g + step
+
+            if tentative < g_here[neighbor]:
+                parent[neighbor] = current[0] * height + current[1]
+                g_here[neighbor] = tentative
+                if g_there[neighbor] < inf and tentative + g_there[neighbor] < best:
+                    best = tentative + g_there[neighbor]
+                    meet = neighbor
+                heappush(open_set, (tentative + heuristic(neighbor, target),
+                                    neighbor))
+
+    if meet is None:
+        return []
+
+    # Forward half: walk parents back to the start, prepending
+    path = deque([meet])
+    node = int(parent_fwd[meet])
+    while node >= 0:
+        path.appendleft((node // height, node % height))
+        node = int(parent_fwd[path[0]])
+    # Backward half: parents point toward the goal, so append
+    node = int(parent_bwd[meet])
+    while node >= 0:
+        path.append((node // height, node % height))
+        node = int(parent_bwd[path[-1]])
+    return list(path)
@@ -1,11 +1,30 @@
+import numpy as np
+
+
 class Robot:
+    """
+    A single robot. Position and target are stored structure-of-arrays style
+    in the owning warehouse (one int32 row per robot) so fleet-wide checks
+    and the movement kernel work on contiguous arrays; this class is a thin
+    facade over that row. Unregistered robots fall back to local tuples.
+    """
+
     def __init__(self, robot_id, x=0, y=0, warehouse=None):
         self.robot_id = robot_id
-        self.current_position = (x, y)
-        self.target_position = (x, y)
+        self._index = None  # Row in the warehouse state arrays once registered
+        self._local_position = (x, y)
+        self._local_target = (x, y)
         self.warehouse = warehouse
         self.is_moving = False
-        self.movement_history = [(x, y)]  # Track all positions the robot has visited
+        # Visited positions, kept in a preallocated int32 buffer with a write
+        # head: appending is one array store instead of a tuple allocation
+        # plus list growth per move
+        self._hist = np.empty((64, 2), dtype=np.int32)
+        self._hist[0] = (x, y)
+        self._hist_n = 1
+        self._move_table = None  # Bound move methods, built on first dispatch
+        if warehouse is not None:
+            warehouse._register_robot(self)
         
         # Energy tracking
         self.total_energy_spent = 0
@@ -15,6 +34,49 @@ class Robot:
         self.energy_per_move = 1.0  # Base energy cost for successful movement
         self.energy_per_blocked_attempt = 0.5  # Energy wasted on blocked attempts
     
+    @property
+    def movement_history(self):
+        """All visited positions as a list of (x, y) tuples, oldest first."""
+        return [(int(px), int(py)) for px, py in self._hist[:self._hist_n]]
+
+    def _push_history(self, x, y):
+        if self._hist_n == self._hist.shape[0]:
+            grown = np.empty((self._hist_n * 2, 2), dtype=np.int32)
+            grown[:self._hist_n] = self._hist
+            self._hist = grown
+        self._hist[self._hist_n] = (x, y)
+        self._hist_n += 1
+
+    @property
+    def current_position(self):
+        if self._index is not None:
+            row = self.warehouse.robot_pos[self._index]
+            return (int(row[0]), int(row[1]))
+        return self._local_position
+
+    @current_position.setter
+    def current_position(self, pos):
+        if self._index is not None:
+            self.warehouse.robot_pos[self._index, 0] = pos[0]
+            self.warehouse.robot_pos[self._index, 1] = pos[1]
+        else:
+            self._local_position = (pos[0], pos[1])
+
+    @property
+    def target_position(self):
+        if self._index is not None:
+            row = self.warehouse.robot_target[self._index]
+            return (int(row[0]), int(row[1]))
+        return self._local_target
+
+    @target_position.setter
+    def target_position(self, pos):
+        if self._index is not None:
+            self.warehouse.robot_target[self._index, 0] = pos[0]
+            self.warehouse.robot_target[self._index, 1] = pos[1]
+        else:
+            self._local_target = (pos[0], pos[1])
+
     def add_congestion_penalty(self, penalty):
         """Add a penalty for moving into a congested cell."""
         self.total_congestion_penalty += penalty
@@ -32,20 +94,19 @@ class Robot:
     def check_collision(self, new_x, new_y):
         if self.warehouse is None:
             return False
-        
-        if not self.warehouse.is_valid_position(new_x, new_y):
-            return True
-        
-        for robot in self.warehouse.active_robots:
-            if robot != self and robot.get_current_position() == (new_x, new_y):
-                return True
-        
-        if self.warehouse.is_blocked_position(new_x, new_y):
+        wh = self.warehouse
+
+        # One bounds test and two byte loads replace the three is_* method
+        # calls; the masks encode the same blocked/in-aisle rules.
+        if not (0 <= new_x < wh.width and 0 <= new_y < wh.height):
             return True
-        
-        if not self.warehouse.is_position_in_aisle(new_x, new_y):
+        if wh.blocked_mask[new_x, new_y] or not wh.aisle_mask[new_x, new_y]:
             return True
-        
+
+        for robot in wh.active_robots:
+            if robot is not self and robot.current_position == (new_x, new_y):
+                return True
+
         return False
     
     def move_left(self):
@@ -54,7 +115,7 @@ class Robot:
         
         if not self.check_collision(new_x, current_y):
             self.current_position = (new_x, current_y)
-            self.movement_history.append((new_x, current_y))
+            self._push_history(new_x, current_y)
             self._consume_energy_for_move()
             return True
         else:
@@ -67,7 +128,7 @@ class Robot:
         
         if not self.check_collision(new_x, current_y):
             self.current_position = (new_x, current_y)
-            self.movement_history.append((new_x, current_y))
+            self._push_history(new_x, current_y)
             return True
         else:
             self._consume_energy_for_blocked_attempt()
@@ -79,7 +140,7 @@ class Robot:
         
         if not self.check_collision(current_x, new_y):
             self.current_position = (current_x, new_y)
-            self.movement_history.append((current_x, new_y))
+            self._push_history(current_x, new_y)
             self._consume_energy_for_move()
             return True
         else:
@@ -92,13 +153,26 @@ class Robot:
         
         if not self.check_collision(current_x, new_y):
             self.current_position = (current_x, new_y)
-            self.movement_history.append((current_x, new_y))
+            self._push_history(current_x, new_y)
             self._consume_energy_for_move()
             return True
         else:
             self._consume_energy_for_blocked_attempt()
             return False
     
+    def _apply_successful_move(self, new_x, new_y):
+        """
+        Record a move that was already validated externally (e.g. by the
+        batched movement kernel in fast_sim).
+        """
+        self.current_position = (new_x, new_y)
+        self._push_history(new_x, new_y)
+        self._consume_energy_for_move()
+
+    def _apply_blocked_attempt(self):
+        """Record a move attempt that was rejected externally."""
+        self._consume_energy_for_blocked_attempt()
+
     def distance_to_target(self):
         """
         Manhattan distance
@@ -111,13 +185,14 @@ class Robot:
         return self.current_position == self.target_position
     
     def get_movement_history(self):
-        return self.movement_history.copy()
-    
+        return self.movement_history
+
     def clear_movement_history(self):
-        self.movement_history = [self.current_position]
-    
+        self._hist[0] = self.current_position
+        self._hist_n = 1
+
     def get_path_length(self):
-        return len(self.movement_history) - 1
+        return self._hist_n - 1
     
     def _consume_energy_for_move(self):
         self.total_energy_spent += self.energy_per_move
@@ -1,10 +1,39 @@
 from robot import Robot
-import matplotlib
-matplotlib.use('TkAgg')  # Use TkAgg backend for better Windows compatibility
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import os
+
 import numpy as np
 
+import fast_sim
+
+# matplotlib is imported on first use rather than at module import: headless
+# optimizer runs and pool workers never plot, so they should not pay the
+# import cost or require a GUI toolkit just to construct a Warehouse. The
+# visualize methods call _ensure_matplotlib() before touching these names.
+plt = None
+patches = None
+LineCollection = None
+PatchCollection = None
+
+
+def _ensure_matplotlib():
+    """Import matplotlib and pick the backend, once, on first plot."""
+    global plt, patches, LineCollection, PatchCollection
+    if plt is not None:
+        return
+    import matplotlib
+    if not os.environ.get('MPLBACKEND'):
+        # TkAgg for better Windows compatibility; an explicit MPLBACKEND
+        # (e.g. Agg on a headless box) always wins.
+        matplotlib.use('TkAgg')
+    import matplotlib.pyplot
+    import matplotlib.patches
+    from matplotlib.collections import LineCollection as _lc, \
+        PatchCollection as _pc
+    plt = matplotlib.pyplot
+    patches = matplotlib.patches
+    LineCollection = _lc
+    PatchCollection = _pc
+
 
 class Warehouse:
     def __init__(self, width, height):
@@ -14,23 +43,111 @@ class Warehouse:
         self.packing_stations = []
         self.aisles = []
         self.active_robots = []
+        self._robots_by_id = {}  # id -> Robot, so lookups skip the list scan
+        # SoA robot state: one int32 row per robot, in active_robots order.
+        # Robot objects delegate their position/target to these arrays, so
+        # fleet-wide checks and the movement kernel stay vectorized.
+        self.robot_pos = np.zeros((0, 2), dtype=np.int32)
+        self.robot_target = np.zeros((0, 2), dtype=np.int32)
         self.blocked_positions = set()
-        self.congestion_map = {}  # To track path congestion
+        # Path congestion per cell. A dense grid rather than a dict: spatial
+        # keys are dense on a bounded grid, so an indexed store beats dict
+        # hashing on every robot move, and the A* kernel (float32 signature)
+        # reads the array directly without any per-search repacking.
+        self.congestion_grid = np.zeros((width, height), dtype=np.float32)
+        self._max_congestion = 0  # Running max, avoids scanning the grid
+        # Cells robots may walk on (aisles, docks, stations), kept in sync
+        # incrementally so is_position_in_aisle is a single array load.
+        self.aisle_mask = np.zeros((width, height), dtype=np.uint8)
+        # Storage/blocked cells mirrored as a dense grid, updated in O(1)
+        # alongside blocked_positions so layout mutations stay cheap.
+        self.blocked_mask = np.zeros((width, height), dtype=np.uint8)
+        # Dock and station cells; infrastructure may never be swapped into
+        # storage by the layout optimizer.
+        self.infra_mask = np.zeros((width, height), dtype=np.uint8)
+        # Swap candidates for the layout optimizer, maintained incrementally
+        # (list + index map, removal by swap-with-last) so neighbor
+        # generation never rescans the grid.
+        self._storage_cells = []
+        self._storage_index = {}
+        self._aisle_cells = []
+        self._aisle_index = {}
+        # Bumped on every change that affects walkability, so callers can
+        # invalidate anything derived from the layout (e.g. distance fields)
+        self._layout_version = 0
+        # Cached static RGB base layer for the plots, rebuilt lazily when
+        # the layout version moves on
+        self._static_rgb = None
+        self._static_rgb_version = -1
+        # Reused congestion-heatmap figure: repeated calls update the image
+        # data in place instead of rebuilding figure, axes and overlay
+        self._cong_fig = None
+        self._cong_ax = None
+        self._cong_im = None
+        self._cong_fig_version = -1
 
     def record_congestion(self, x, y):
         """Record that a robot has passed through a certain cell."""
-        pos = (x, y)
-        self.congestion_map[pos] = self.congestion_map.get(pos, 0) + 1
+        if 0 <= x < self.width and 0 <= y < self.height:
+            count = self.congestion_grid[x, y] + 1
+            self.congestion_grid[x, y] = count
+            if count > self._max_congestion:
+                self._max_congestion = int(count)
 
     def get_congestion(self, x, y):
         """Get the congestion level of a cell."""
-        #print(f"Getting congestion for position: ({x}, {y}): {self.congestion_map.get((x, y), 0)}")
-        return self.congestion_map.get((x, y), 0)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return int(self.congestion_grid[x, y])
+        return 0
+
+    def record_and_get_congestion(self, x, y):
+        """
+        Record that a robot entered a cell and return the updated congestion
+        level. Fuses record_congestion + get_congestion into a single grid
+        update for the per-move hot path.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return 0
+        count = self.congestion_grid[x, y] + 1
+        self.congestion_grid[x, y] = count
+        if count > self._max_congestion:
+            self._max_congestion = int(count)
+        return int(count)
+
+    def record_congestion_batch(self, pos, moved):
+        """
+        Record one visit for every robot that moved this tick, in a single
+        compiled pass over the SoA position array.
+
+        Args:
+            pos (int32[N, 2]): Robot positions after the step.
+            moved (uint8[N]): 1 for robots whose move succeeded.
+
+        Returns:
+            float32[N]: Updated visit count per moved robot, 0 for the rest.
+        """
+        if fast_sim.NUMBA_AVAILABLE:
+            counts = fast_sim.bump_congestion(self.congestion_grid, pos, moved)
+            if counts.size:
+                peak = counts.max()
+                if peak > self._max_congestion:
+                    self._max_congestion = int(peak)
+            return counts
+        counts = np.zeros(len(moved), dtype=np.float32)
+        for i, hit in enumerate(moved):
+            if hit:
+                counts[i] = self.record_and_get_congestion(int(pos[i, 0]),
+                                                           int(pos[i, 1]))
+        return counts
 
     def reset_congestion(self):
-        """Reset the congestion map."""
-        #print(f"Resetting congestion map: {self.congestion_map}")
-        self.congestion_map.clear()
+        """Reset the congestion grid."""
+        self.congestion_grid.fill(0)
+        self._max_congestion = 0
+
+    def get_max_congestion(self):
+        """Highest congestion count seen since the last reset (running max)."""
+        return self._max_congestion
         
     def add_entry_dock(self, x, y, dock_id=None):
         dock = {
@@ -39,6 +156,12 @@ class Warehouse:
         }
         self.entry_docks.append(dock)
         self.blocked_positions.add((x, y))
+        if self.is_valid_position(x, y):
+            self.aisle_mask[x, y] = 1
+            self.blocked_mask[x, y] = 1
+            self.infra_mask[x, y] = 1
+            self._sync_candidates(x, y)
+        self._layout_version += 1
     
     def add_packing_station(self, x, y, station_id=None):
         station = {
@@ -47,54 +170,108 @@ class Warehouse:
         }
         self.packing_stations.append(station)
         #self.blocked_positions.add((x, y))
+        if self.is_valid_position(x, y):
+            self.aisle_mask[x, y] = 1
+            self.infra_mask[x, y] = 1
+            self._sync_candidates(x, y)
+        self._layout_version += 1
     
     def add_aisle(self, start_x, start_y, end_x, end_y, aisle_id=None):
         aisle = {
             'start': (start_x, start_y),
             'end': (end_x, end_y),
             'aisle_id': aisle_id or f"aisle_{len(self.aisles)}",
-            'positions': []
+            # A set, so the optimizer's swap edits are O(1) lookups/removals
+            'positions': set()
         }
-        
-        if start_x == end_x: 
+
+        if start_x == end_x:
             min_y, max_y = min(start_y, end_y), max(start_y, end_y)
-            aisle['positions'] = [(start_x, y) for y in range(min_y, max_y + 1)]
-        elif start_y == end_y: 
+            aisle['positions'] = {(start_x, y) for y in range(min_y, max_y + 1)}
+            self.aisle_mask[start_x, min_y:max_y + 1] = 1
+        elif start_y == end_y:
             min_x, max_x = min(start_x, end_x), max(start_x, end_x)
-            aisle['positions'] = [(x, start_y) for x in range(min_x, max_x + 1)]
+            aisle['positions'] = {(x, start_y) for x in range(min_x, max_x + 1)}
+            self.aisle_mask[min_x:max_x + 1, start_y] = 1
         else:
-            aisle['positions'] = [(start_x, y) for y in range(start_y, end_y + 1)]
-            aisle['positions'].extend([(x, end_y) for x in range(start_x + 1, end_x + 1)])
-        
+            aisle['positions'] = {(start_x, y) for y in range(start_y, end_y + 1)}
+            aisle['positions'].update((x, end_y) for x in range(start_x + 1, end_x + 1))
+            for x, y in aisle['positions']:
+                if self.is_valid_position(x, y):
+                    self.aisle_mask[x, y] = 1
+
         self.aisles.append(aisle)
+        for x, y in aisle['positions']:
+            self._sync_candidates(x, y)
+        self._layout_version += 1
     
+    def _register_robot(self, robot):
+        """Attach a robot to this warehouse and give it a row in the state arrays."""
+        robot.warehouse = self
+        robot._index = len(self.active_robots)
+        self.active_robots.append(robot)
+        self._robots_by_id[robot.robot_id] = robot
+        self.robot_pos = np.vstack(
+            [self.robot_pos, np.array([robot._local_position], dtype=np.int32)])
+        self.robot_target = np.vstack(
+            [self.robot_target, np.array([robot._local_target], dtype=np.int32)])
+
     def add_robot(self, robot):
         if isinstance(robot, Robot):
-            robot.warehouse = self 
-            self.active_robots.append(robot)
+            if robot._index is None:
+                self._register_robot(robot)
         else:
             raise TypeError("Only Robot instances can be added to the warehouse")
-    
+
     def create_and_add_robot(self, robot_id, x=0, y=0):
-        robot = Robot(robot_id, x, y, self)
-        self.active_robots.append(robot)
-        return robot
-    
+        # The Robot constructor registers itself when given a warehouse
+        return Robot(robot_id, x, y, self)
+
     def remove_robot(self, robot_id):
-        for i, robot in enumerate(self.active_robots):
-            if robot.robot_id == robot_id:
-                self.active_robots.pop(i)
-                return True
-        return False
+        robot = self._robots_by_id.pop(robot_id, None)
+        if robot is None:
+            return False
+        # Detach the facade before dropping its row
+        i = robot._index
+        robot._local_position = robot.current_position
+        robot._local_target = robot.target_position
+        robot._index = None
+        self.active_robots.pop(i)
+        self.robot_pos = np.delete(self.robot_pos, i, axis=0)
+        self.robot_target = np.delete(self.robot_target, i, axis=0)
+        for later_robot in self.active_robots[i:]:
+            later_robot._index -= 1
+        return True
+
+    def clear_robots(self):
+        """Remove all robots and reset the SoA state arrays."""
+        for robot in self.active_robots:
+            robot._local_position = robot.current_position
+            robot._local_target = robot.target_position
+            robot._index = None
+        self.active_robots.clear()
+        self._robots_by_id.clear()
+        self.robot_pos = np.zeros((0, 2), dtype=np.int32)
+        self.robot_target = np.zeros((0, 2), dtype=np.int32)
+
+    def all_robots_at_target(self):
+        """Vectorized 'is the whole fleet done' check over the state arrays."""
+        if not self.active_robots:
+            return True
+        return bool((self.robot_pos == self.robot_target).all())
     
     def get_robot_by_id(self, robot_id):
-        for robot in self.active_robots:
-            if robot.robot_id == robot_id:
-                return robot
-        return None
+        return self._robots_by_id.get(robot_id)
     
     def is_valid_position(self, x, y):
         return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_valid_positions(self, xs, ys):
+        """
+        Batch form of is_valid_position: given coordinate arrays, return a
+        bool mask of the in-bounds entries in one vectorized comparison.
+        """
+        return (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
     
     def is_blocked_position(self, x, y):
         return (x, y) in self.blocked_positions
@@ -110,159 +287,262 @@ class Warehouse:
         Returns:
             bool: True if position is in an aisle, False otherwise
         """
-        # Check if position is in any aisle
-        for aisle in self.aisles:
-            if (x, y) in aisle['positions']:
-                return True
-        
-        # Also allow movement on entry docks and packing stations
-        # (robots need to access these for loading/unloading)
-        for dock in self.entry_docks:
-            if dock['position'] == (x, y):
-                return True
-        
-        for station in self.packing_stations:
-            if station['position'] == (x, y):
-                return True
-        
-        return False
+        # The mask already covers aisles plus entry docks and packing
+        # stations (robots need to access those for loading/unloading).
+        if not self.is_valid_position(x, y):
+            return False
+        return bool(self.aisle_mask[x, y])
     
     def add_blocked_position(self, x, y):
         self.blocked_positions.add((x, y))
-    
+        if self.is_valid_position(x, y):
+            self.blocked_mask[x, y] = 1
+            self._sync_candidates(x, y)
+        self._layout_version += 1
+
+    def add_blocked_positions(self, positions):
+        """Add many blocked positions at once from an iterable of (x, y) tuples."""
+        positions = list(positions)
+        self.blocked_positions.update(positions)
+        for x, y in positions:
+            if self.is_valid_position(x, y):
+                self.blocked_mask[x, y] = 1
+                self._sync_candidates(x, y)
+        self._layout_version += 1
+
     def remove_blocked_position(self, x, y):
         self.blocked_positions.discard((x, y))
+        if self.is_valid_position(x, y):
+            self.blocked_mask[x, y] = 0
+            self._sync_candidates(x, y)
+        self._layout_version += 1
+
+    @staticmethod
+    def _candidate_update(cells, index, pos, member):
+        """Add or drop pos from one candidate list in O(1) (swap-with-last)."""
+        present = pos in index
+        if member and not present:
+            index[pos] = len(cells)
+            cells.append(pos)
+        elif not member and present:
+            i = index.pop(pos)
+            last = cells.pop()
+            if i < len(cells):
+                cells[i] = last
+                index[last] = i
+
+    def _sync_candidates(self, x, y):
+        """
+        Recompute one cell's membership in the optimizer candidate lists
+        from the masks: storage candidates are blocked non-infrastructure
+        cells, aisle candidates are walkable, unblocked non-infrastructure
+        cells. Called after any mask change to that cell.
+        """
+        if not self.is_valid_position(x, y):
+            return
+        pos = (x, y)
+        if self.infra_mask[x, y]:
+            self._candidate_update(self._storage_cells, self._storage_index, pos, False)
+            self._candidate_update(self._aisle_cells, self._aisle_index, pos, False)
+            return
+        blocked = bool(self.blocked_mask[x, y])
+        self._candidate_update(self._storage_cells, self._storage_index, pos, blocked)
+        self._candidate_update(self._aisle_cells, self._aisle_index, pos,
+                               not blocked and bool(self.aisle_mask[x, y]))
+
+    def toggle_blocked(self, x, y):
+        """
+        Flip one cell between blocked and free. This is the cheap local
+        mutation used by the layout optimizers: only the cell itself and the
+        cached masks change, nothing is rebuilt.
+        """
+        if (x, y) in self.blocked_positions:
+            self.remove_blocked_position(x, y)
+        else:
+            self.add_blocked_position(x, y)
     
+    def get_passability_mask(self):
+        """
+        Build a uint8 grid marking every cell a robot may occupy: cells that
+        are part of an aisle, dock or station and not blocked by storage.
+        Mirrors the checks performed by Robot.check_collision.
+        """
+        # Walkable infrastructure minus storage; both masks are maintained
+        # incrementally so this is a single vectorized combine.
+        return self.aisle_mask & (1 - self.blocked_mask)
+
+    # The collection getters return the live lists without copying; treat
+    # them as read-only. Every in-tree caller only iterates, and mutations
+    # must go through the add_*/remove_* methods anyway so the masks and
+    # candidate lists stay in sync.
     def get_entry_docks(self):
-        return self.entry_docks.copy()
-    
+        return self.entry_docks
+
     def get_packing_stations(self):
-        return self.packing_stations.copy()
-    
+        return self.packing_stations
+
     def get_aisles(self):
-        return self.aisles.copy()
-    
+        return self.aisles
+
     def get_active_robots(self):
-        return self.active_robots.copy()
+        return self.active_robots
     
     def get_robot_positions(self):
         return {robot.robot_id: robot.get_current_position() for robot in self.active_robots}
+
+    def get_robot_positions_array(self):
+        """
+        Bulk form of get_robot_positions: the robot ids in row order plus
+        the (N, 2) int32 position array itself. No copies are made — the
+        array is the live SoA state the movement kernel updates, so callers
+        that need a stable snapshot (e.g. for planning) must .copy() it,
+        while bulk readers get the contiguous buffer for free.
+        """
+        return [robot.robot_id for robot in self.active_robots], self.robot_pos
     
     def is_position_occupied_by_robot(self, x, y):
-        for robot in self.active_robots:
-            if robot.get_current_position() == (x, y):
-                return robot
+        # One vectorized comparison over the SoA position rows instead of a
+        # Python call per robot; a position->robot dict would go stale when
+        # the movement kernel updates the rows in place, so it is not used
+        hits = np.nonzero((self.robot_pos[:, 0] == x)
+                          & (self.robot_pos[:, 1] == y))[0]
+        if hits.size:
+            return self.active_robots[hits[0]]
         return None
     
-    def visualize_congestion_map(self, title="Warehouse Congestion Map", save_path=None):
+    def visualize_congestion_map(self, title="Warehouse Congestion Map", save_path=None,
+                                 fast=False, dpi=300):
         """
         Visualize the congestion map as a heatmap.
+
+        With fast=True the layout solve is skipped and the window is only
+        refreshed (not blocked on), for cheap intermediate frames while
+        debugging; dpi applies to saves and defaults to print quality.
         """
-        fig, ax = plt.subplots(figsize=(12, 9))
-        
-        congestion_grid = np.zeros((self.height, self.width))
-        for (x, y), count in self.congestion_map.items():
-            if self.is_valid_position(x, y):
-                congestion_grid[y, x] = count
-        
-        if not self.congestion_map:
-            max_congestion = 1
+        _ensure_matplotlib()
+        max_congestion = max(self.get_max_congestion(), 1)
+
+        reusable = (self._cong_fig is not None
+                    and plt.fignum_exists(self._cong_fig.number)
+                    and self._cong_fig_version == self._layout_version)
+        if reusable:
+            # Update the existing image in place: no new artists, no layout
+            # pass, just fresh pixel data and color limits
+            fig, ax = self._cong_fig, self._cong_ax
+            self._cong_im.set_data(self.congestion_grid.T)
+            self._cong_im.set_clim(0, max_congestion)
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            fig.canvas.draw_idle()
         else:
-            max_congestion = max(self.congestion_map.values()) if self.congestion_map else 1
+            fig, ax = plt.subplots(figsize=(12, 9))
+
+            # The grid is stored [x, y]; imshow wants rows as y, so transpose
+            cax = ax.imshow(self.congestion_grid.T, cmap='hot', interpolation='nearest', vmin=0, vmax=max_congestion)
+
+            # Add a color bar
+            fig.colorbar(cax, label='Number of Times Visited')
+
+            # Overlay the warehouse structure for context
+            self._overlay_warehouse_structure(ax)
+
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            ax.set_xlabel('X Coordinate')
+            ax.set_ylabel('Y Coordinate')
+
+            if not fast:
+                plt.tight_layout()
+
+            self._cong_fig, self._cong_ax, self._cong_im = fig, ax, cax
+            self._cong_fig_version = self._layout_version
 
-        # Create the heatmap
-        cax = ax.imshow(congestion_grid, cmap='hot', interpolation='nearest', vmin=0, vmax=max_congestion)
-        
-        # Add a color bar
-        fig.colorbar(cax, label='Number of Times Visited')
-        
-        # Overlay the warehouse structure for context
-        self._overlay_warehouse_structure(ax)
-        
-        ax.set_title(title, fontsize=14, fontweight='bold')
-        ax.set_xlabel('X Coordinate')
-        ax.set_ylabel('Y Coordinate')
-        
-        plt.tight_layout()
-        
         if save_path:
-            plt.savefig(save_path, dpi=300)
+            # Save through the figure handle; the pyplot-current figure may
+            # differ from the reused one
+            fig.savefig(save_path, dpi=(100 if fast else dpi))
             print(f"Congestion map saved to: {save_path}")
-            
+
         try:
-            plt.show()
+            if fast:
+                plt.pause(0.001)
+            else:
+                plt.show()
         except Exception as e:
             print(f"Display error: {e}")
 
     def _overlay_warehouse_structure(self, ax):
         """Helper to draw the warehouse layout on top of a plot."""
-        # Draw blocked positions
-        for x, y in self.blocked_positions:
-            rect = patches.Rectangle((x - 0.5, y - 0.5), 1, 1, linewidth=1, edgecolor='black', facecolor='gray', alpha=0.5)
-            ax.add_patch(rect)
-            
-        # Draw docks
-        for dock in self.entry_docks:
-            x, y = dock['position']
-            rect = patches.Rectangle((x - 0.5, y - 0.5), 1, 1, linewidth=1, edgecolor='blue', facecolor='none')
-            ax.add_patch(rect)
-            ax.text(x, y, 'D', ha='center', va='center', color='blue', fontweight='bold')
+        # Each category of rectangles becomes one PatchCollection — a single
+        # artist and paint pass however many cells there are — instead of
+        # one Rectangle artist per cell
+        if self.blocked_positions:
+            rects = [patches.Rectangle((x - 0.5, y - 0.5), 1, 1)
+                     for x, y in self.blocked_positions]
+            ax.add_collection(PatchCollection(rects, linewidth=1,
+                                              edgecolor='black',
+                                              facecolor='gray', alpha=0.5))
 
-        # Draw stations
-        for station in self.packing_stations:
-            x, y = station['position']
-            rect = patches.Rectangle((x - 0.5, y - 0.5), 1, 1, linewidth=1, edgecolor='green', facecolor='none')
-            ax.add_patch(rect)
-            ax.text(x, y, 'P', ha='center', va='center', color='green', fontweight='bold')
+        if self.entry_docks:
+            rects = [patches.Rectangle((d['position'][0] - 0.5,
+                                        d['position'][1] - 0.5), 1, 1)
+                     for d in self.entry_docks]
+            ax.add_collection(PatchCollection(rects, linewidth=1,
+                                              edgecolor='blue',
+                                              facecolor='none'))
+            for dock in self.entry_docks:
+                x, y = dock['position']
+                ax.text(x, y, 'D', ha='center', va='center', color='blue', fontweight='bold')
+
+        if self.packing_stations:
+            rects = [patches.Rectangle((s['position'][0] - 0.5,
+                                        s['position'][1] - 0.5), 1, 1)
+                     for s in self.packing_stations]
+            ax.add_collection(PatchCollection(rects, linewidth=1,
+                                              edgecolor='green',
+                                              facecolor='none'))
+            for station in self.packing_stations:
+                x, y = station['position']
+                ax.text(x, y, 'P', ha='center', va='center', color='green', fontweight='bold')
 
     def get_warehouse_layout(self):
-        layout = [['.' for _ in range(self.width)] for _ in range(self.height)]
-        
+        # Character grid built with vectorized stores per category; the
+        # aisle/blocked stamps come from the dense masks and only land on
+        # cells still empty, preserving the dock/station markers.
+        layout = np.full((self.height, self.width), '.', dtype='<U1')
+
         # Mark entry docks
         for dock in self.entry_docks:
             x, y = dock['position']
             if self.is_valid_position(x, y):
-                layout[y][x] = 'D'
-        
+                layout[y, x] = 'D'
+
         # Mark packing stations
         for station in self.packing_stations:
             x, y = station['position']
             if self.is_valid_position(x, y):
-                layout[y][x] = 'P'
-        
-        # Mark aisles
-        for aisle in self.aisles:
-            for x, y in aisle['positions']:
-                if self.is_valid_position(x, y) and layout[y][x] == '.':
-                    layout[y][x] = 'A'
-        
-        # Mark blocked positions
-        for x, y in self.blocked_positions:
-            if self.is_valid_position(x, y) and layout[y][x] == '.':
-                layout[y][x] = 'X'
-        
-        # Mark robots
-        for robot in self.active_robots:
-            x, y = robot.get_current_position()
-            if self.is_valid_position(x, y):
-                layout[y][x] = 'R'
-        
-        return layout
+                layout[y, x] = 'P'
+
+        # Mark aisles, then blocked positions, on untouched cells only
+        layout[(layout == '.') & (self.aisle_mask.T == 1)] = 'A'
+        layout[(layout == '.') & (self.blocked_mask.T == 1)] = 'X'
+
+        # Mark robots on top of everything
+        if len(self.robot_pos):
+            xs, ys = self.robot_pos.T
+            ok = self.is_valid_positions(xs, ys)
+            layout[ys[ok], xs[ok]] = 'R'
+
+        # Nested lists at the boundary, matching the original contract
+        return layout.tolist()
     
     def visualize_robot_movement_step(self, step_number, title_prefix="Step"):
         title = f"{title_prefix} {step_number} - Robot Positions"
         return self.visualize_warehouse(title=title, show_grid=True)
     
-    def visualize_before_after(self, initial_positions, title="Warehouse Layout - Before and After Movement", save_path=None):
+    def visualize_before_after(self, initial_positions, title="Warehouse Layout - Before and After Movement", save_path=None,
+                               fast=False, dpi=300):
+        _ensure_matplotlib()
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 9))
-        
-        # Store current positions and histories temporarily
-        current_positions = {}
-        current_histories = {}
-        for robot in self.active_robots:
-            current_positions[robot.robot_id] = robot.current_position
-            current_histories[robot.robot_id] = robot.movement_history.copy()
-        
+
         # Create left plot (initial state)
         self._create_warehouse_plot(ax1, "Initial State", show_target_arrows=True, initial_state=True, initial_positions=initial_positions)
         
@@ -272,27 +552,71 @@ class Warehouse:
         # Set overall title
         fig.suptitle(title, fontsize=16, fontweight='bold')
         
-        # Adjust layout
-        plt.tight_layout()
-        
+        # Adjust layout; the solve and the bbox pass below dominate the cost
+        # of this figure, so fast=True trades polish for turnaround when the
+        # plot is produced every few optimizer iterations
+        if fast:
+            dpi = 100
+        else:
+            plt.tight_layout()
+
         # Save if path provided
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            plt.savefig(save_path, dpi=dpi,
+                        bbox_inches=None if fast else 'tight')
             print(f"Warehouse layout saved to: {save_path}")
-        
+
         # Show the plot
         try:
-            plt.show()
+            if fast:
+                plt.pause(0.001)
+            else:
+                plt.show()
         except Exception as e:
             print(f"Display error: {e}")
             print("Trying to save plot instead...")
             if not save_path:
                 save_path = f"warehouse_before_after_{title.replace(' ', '_').lower()}.png"
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            plt.savefig(save_path, dpi=dpi,
+                        bbox_inches=None if fast else 'tight')
             print(f"Plot saved to: {save_path}")
         
         return fig, (ax1, ax2)
     
+    def _get_static_rgb(self):
+        """
+        RGB base layer of the layout (empty, blocked, aisle, dock and
+        station colors), cached until the layout version moves on. Callers
+        must copy before drawing per-frame overlays.
+        """
+        if self._static_rgb is not None and self._static_rgb_version == self._layout_version:
+            return self._static_rgb
+
+        grid = np.ones((self.height, self.width, 3))
+
+        # Blocked cells, then aisles. The dense masks already hold exactly
+        # these cells, so each category is one vectorized store instead of
+        # a per-cell Python loop; docks and stations are stamped afterwards
+        # and end up on top either way.
+        grid[self.blocked_mask.T == 1] = [0.545, 0.271, 0.075]  # Brown
+        grid[self.aisle_mask.T == 1] = [0.902, 0.902, 0.980]  # Light lavender
+
+        dock_xy = [d['position'] for d in self.entry_docks
+                   if self.is_valid_position(*d['position'])]
+        if dock_xy:
+            xs, ys = np.array(dock_xy, dtype=np.intp).T
+            grid[ys, xs] = [0.255, 0.412, 0.882]  # Royal blue
+
+        station_xy = [s['position'] for s in self.packing_stations
+                      if self.is_valid_position(*s['position'])]
+        if station_xy:
+            xs, ys = np.array(station_xy, dtype=np.intp).T
+            grid[ys, xs] = [0.196, 0.804, 0.196]  # Lime green
+
+        self._static_rgb = grid
+        self._static_rgb_version = self._layout_version
+        return grid
+
     def _create_warehouse_plot(self, ax, title, show_target_arrows=True, initial_state=False, initial_positions=None):
         colors = {
             'empty': '#FFFFFF',      
@@ -304,47 +628,31 @@ class Warehouse:
             'robot_target': '#FFB6C1' 
         }
         
-        # Create the base grid
-        warehouse_grid = np.ones((self.height, self.width, 3))  
-        
-        # Fill empty spaces
-        warehouse_grid[:, :] = [1.0, 1.0, 1.0]  
-        
-        # Mark blocked positions (storage areas)
-        for x, y in self.blocked_positions:
-            if self.is_valid_position(x, y):
-                warehouse_grid[y, x] = [0.545, 0.271, 0.075]  # Brown
-        
-        # Mark aisles
-        for aisle in self.aisles:
-            for x, y in aisle['positions']:
-                if self.is_valid_position(x, y):
-                    warehouse_grid[y, x] = [0.902, 0.902, 0.980]  # Light lavender
+        # The static part of the frame (empty/blocked/aisle/dock/station) is
+        # cached per layout version; each call just copies it and overlays
+        # the per-frame robot targets on top
+        warehouse_grid = self._get_static_rgb().copy()
         
-        # Mark entry docks
-        for dock in self.entry_docks:
-            x, y = dock['position']
-            if self.is_valid_position(x, y):
-                warehouse_grid[y, x] = [0.255, 0.412, 0.882]  # Royal blue
-        
-        # Mark packing stations
-        for station in self.packing_stations:
-            x, y = station['position']
-            if self.is_valid_position(x, y):
-                warehouse_grid[y, x] = [0.196, 0.804, 0.196]  # Lime green
-        
-        # Mark robot targets (before robots so robots appear on top)
-        for robot in self.active_robots:
-            target_x, target_y = robot.get_target_position()
-            if self.is_valid_position(target_x, target_y):
-                warehouse_grid[target_y, target_x] = [1.0, 0.714, 0.757]  # Light pink
+        # Mark robot targets (before robots so robots appear on top): one
+        # fancy-indexed store from the SoA target rows, bounds-masked
+        if len(self.robot_target):
+            txs, tys = self.robot_target.T
+            ok = self.is_valid_positions(txs, tys)
+            warehouse_grid[tys[ok], txs[ok]] = [1.0, 0.714, 0.757]  # Light pink
         
         # Display the grid
         ax.imshow(warehouse_grid, aspect='equal', origin='upper')
         
         # Robot colors for paths
         robot_colors = ['#FF1493', '#00CED1', '#FFD700', '#9370DB', '#FF4500']
-        
+
+        # Histories are drawn as one collection per kind after the loop: a
+        # single LineCollection for all path lines and a single scatter for
+        # all intermediate dots, instead of one artist per point
+        path_segments = []
+        path_colors = []
+        dot_x, dot_y, dot_c = [], [], []
+
         # Add robots and paths
         for i, robot in enumerate(self.active_robots):
             robot_color = robot_colors[i % len(robot_colors)]
@@ -375,21 +683,17 @@ class Warehouse:
                            ha='center', va='center', fontsize=8, fontweight='bold', 
                            color='white', zorder=11)
                 
-                # Draw movement path
-                movement_history = robot.get_movement_history()
-                if len(movement_history) > 1:
-                    # Extract x and y coordinates for the path
-                    path_x = [pos[0] for pos in movement_history]
-                    path_y = [pos[1] for pos in movement_history]
-                    
-                    # Draw the path line
-                    ax.plot(path_x, path_y, color=robot_color, alpha=0.6, linewidth=2, 
-                           linestyle='-', zorder=6)
-                    
-                    # Draw dots for each position in the path (excluding current position)
-                    for j, (px, py) in enumerate(movement_history[:-1]):  # Exclude current position
-                        circle = patches.Circle((px, py), 0.15, color=robot_color, alpha=0.8, zorder=7)
-                        ax.add_patch(circle)
+                # Collect movement path for the batched draw below, straight
+                # from the robot's history buffer: LineCollection and scatter
+                # take the (n, 2) int32 slice as-is, so no tuple list is built
+                hist = robot._hist[:robot._hist_n]
+                if len(hist) > 1:
+                    path_segments.append(hist)
+                    path_colors.append(robot_color)
+                    # Dots for each position in the path (excluding current)
+                    dot_x.append(hist[:-1, 0])
+                    dot_y.append(hist[:-1, 1])
+                    dot_c.extend([robot_color] * (len(hist) - 1))
                 
                 # Show arrow to target if enabled
                 if show_target_arrows and not robot.is_at_target():
@@ -397,7 +701,16 @@ class Warehouse:
                     ax.annotate('', xy=(target_x, target_y), xytext=(x, y),
                                arrowprops=dict(arrowstyle='->', color=robot_color, alpha=0.9, lw=2),
                                zorder=8)
-        
+
+        # One artist for all path lines and one for all history dots,
+        # whatever the robot count or history length
+        if path_segments:
+            ax.add_collection(LineCollection(path_segments, colors=path_colors,
+                                             alpha=0.6, linewidths=2, zorder=6))
+        if dot_x:
+            ax.scatter(np.concatenate(dot_x), np.concatenate(dot_y), s=60,
+                       c=dot_c, alpha=0.8, zorder=7, edgecolors='none')
+
         # Add labels for infrastructure
         label_offset = 0.25
         